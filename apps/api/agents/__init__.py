@@ -2,7 +2,12 @@
 AI Agent modules for TCG Pipeline
 """
 from .ai_agent import AIAgent, ai_agent
-from .thought_logging import get_realtime_thoughts, clear_realtime_thoughts
+from .thought_logging import (
+    get_realtime_thoughts, get_realtime_thoughts_since, get_realtime_thoughts_json, get_realtime_thoughts_json_since,
+    drain_realtime_thoughts, clear_realtime_thoughts, wait_for_realtime_thoughts,
+)
 
-__all__ = ["AIAgent", "ai_agent", "get_realtime_thoughts", "clear_realtime_thoughts"]
+__all__ = ["AIAgent", "ai_agent", "get_realtime_thoughts", "get_realtime_thoughts_since", "get_realtime_thoughts_json",
+    "get_realtime_thoughts_json_since", "drain_realtime_thoughts", "clear_realtime_thoughts",
+    "wait_for_realtime_thoughts"]
 
@@ -3,14 +3,45 @@ AI Agent for TCG Pipeline
 Main orchestrator that coordinates all processing components
 """
 from __future__ import annotations
-from typing import Any, Dict, List
-from openai import OpenAI
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from core.settings import settings
 from .thought_logging import ThoughtLogger, get_realtime_thoughts, clear_realtime_thoughts
 from .mcp_client import MCPClient
 from .processing_planner import ProcessingPlanner
 from .card_processor import CardProcessor
 from .pair_processor import PairProcessor
+from .results import PairResult
+
+logger = logging.getLogger(__name__)
+
+# One OpenAI client for the whole process; HTTP/2 lets concurrent plan requests share a connection
+_openai_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Get the shared OpenAI client, creating it on first use"""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            timeout=settings.openai_timeout,
+            max_retries=settings.openai_max_retries,
+            http_client=DefaultAsyncHttpxClient(http2=True)
+        )
+    return _openai_client
+
+
+async def close_openai_client():
+    """Close the shared OpenAI client (on shutdown)"""
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
 
 
 class AIAgent:
@@ -19,40 +50,57 @@ class AIAgent:
     Uses ChatGPT to make intelligent decisions about tool usage
     """
     
-    def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
-        self.thought_logger = ThoughtLogger()
+    def __init__(self, max_concurrent_cards: Optional[int] = None):
+        # Cards (or pairs) processed at once; defaults to settings.max_concurrent_cards
+        self.max_concurrent_cards = max_concurrent_cards or settings.max_concurrent_cards
+        self.client = get_openai_client()
+        self.thought_logger = ThoughtLogger(keep_local=True)  # Batch results include the thought log
         self.mcp_client = MCPClient(self.thought_logger)
         self.planner = ProcessingPlanner(self.client, self.thought_logger)
         self.pair_processor = PairProcessor(self.thought_logger)
+        self.card_processor = CardProcessor(self.mcp_client, self.thought_logger)
+    
+    async def aclose(self):
+        """Flush the agent's pending real-time thoughts
+        
+        The agent holds no network resources of its own: the OpenAI and MCP HTTP clients are
+        shared by every agent and closed on shutdown.
+        """
+        self.thought_logger.flush()
     
     def log_thought(self, thought: str, step: str = "processing", metadata: Dict[str, Any] = None):
         """Log agent's thought process (delegates to thought_logger)"""
         self.thought_logger.log_thought(thought, step, metadata)
     
+    def log_event(self, kind: str, step: str = "processing", **payload: Any):
+        """Log a structured event (delegates to thought_logger)"""
+        self.thought_logger.log_event(kind, step, **payload)
+    
     async def process_batch(self, cards: List[Dict], user_options: Dict[str, bool], session_id: str = None) -> Dict[str, Any]:
         """
         Process a batch of cards using AI Agent orchestration
         """
-        self.thought_logger.thought_log = []  # Reset thought log
+        self.thought_logger.flush()  # Publish anything still buffered for the previous session
+        self.thought_logger.clear_log()  # Reset thought log
         self.thought_logger.session_id = session_id  # Set session ID for real-time thoughts
-        self.log_thought(f"Starting batch processing of {len(cards)} cards", "start")
+        self.log_event("batch_start", "start", count=len(cards), pairs=False)
         
         # Analyze user options and make intelligent decisions
         processing_plan = await self.planner.create_plan(cards, user_options)
-        self.log_thought(f"Processing plan: {processing_plan}", "planning")
+        self.log_event("plan_ready", "planning")
         
         # Execute the processing plan
         results = await self._execute_processing_plan(cards, processing_plan)
         
         # Generate final summary
         summary = await self._generate_summary(results)
-        self.log_thought(f"Batch processing complete: {summary}", "complete")
+        self.log_event("batch_complete", "complete")
+        self.thought_logger.flush()
         
         return {
-            "results": results,
+            "results": [result.to_dict() for result in results],
             "summary": summary,
-            "thought_log": self.thought_logger.thought_log,
+            "thought_log": self.thought_logger.get_log(),
             "processing_plan": processing_plan
         }
     
@@ -61,62 +109,107 @@ class AIAgent:
         Process a batch of card pairs (front + back) using AI Agent orchestration
         Front and back are bound together - only front is identified, back is skipped for identification
         """
-        self.thought_logger.thought_log = []  # Reset thought log
+        self.thought_logger.flush()  # Publish anything still buffered for the previous session
+        self.thought_logger.clear_log()  # Reset thought log
         self.thought_logger.session_id = session_id  # Set session ID for real-time thoughts
         pair_count = len(card_pairs)
-        self.log_thought(f"Starting batch processing of {pair_count} card pair(s)", "start")
+        self.log_event("batch_start", "start", count=pair_count, pairs=True)
         
         # Analyze user options and create processing plan
         processing_plan = await self.planner.create_plan([], user_options)
-        self.log_thought(f"Processing plan: {processing_plan}", "planning")
+        self.log_event("plan_ready", "planning")
         
         # Execute the processing plan on pairs
         results = await self._execute_processing_plan_pairs(card_pairs, processing_plan)
         
         # Generate final summary
         summary = await self._generate_summary(results)
-        self.log_thought(f"Batch processing complete: {summary}", "complete")
+        self.log_event("batch_complete", "complete")
+        self.thought_logger.flush()
         
         return {
-            "results": results,
+            "results": [result.to_dict() for result in results],
             "summary": summary,
-            "thought_log": self.thought_logger.thought_log,
+            "thought_log": self.thought_logger.get_log(),
             "processing_plan": processing_plan
         }
     
-    async def _execute_processing_plan(self, cards: List[Dict], plan: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Execute the processing plan on all cards"""
-        results = []
+    async def _execute_processing_plan(self, cards: List[Dict], plan: Dict[str, Any]) -> List[PairResult]:
+        """Execute the processing plan on all cards through the bounded worker pipeline"""
+        plan = self._with_enabled_steps(plan)
         
-        for i, card in enumerate(cards):
-            self.log_thought(f"Processing card {i+1}/{len(cards)}", "processing")
-            if i > 0:
-                self.log_thought(f"Moving on to card {i+1} of {len(cards)}...", "processing")
+        async def run(i: int, card: Dict) -> PairResult:
+            self.log_event("processing_card", "processing", card=i+1)
             # For single cards, use legacy processing (not implemented in refactor yet)
             # This is a placeholder - you may want to implement single card processing
-            card_result = await self._process_single_card(card, plan, i)
-            results.append(card_result)
-            if i < len(cards) - 1:
-                self.log_thought(f"Card {i+1} is done! Let me examine the next one...", "success")
+            return await self._process_single_card(card, plan, i)
         
-        return results
+        outcomes = await self._run_pipeline(cards, run)
+        return self._collect_results(outcomes, pairs=False)
     
-    async def _execute_processing_plan_pairs(self, card_pairs: List[Dict], plan: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Execute the processing plan on all card pairs - front and back are bound together"""
-        results = []
+    async def _execute_processing_plan_pairs(self, card_pairs: List[Dict], plan: Dict[str, Any]) -> List[PairResult]:
+        """Execute the processing plan on all card pairs through the bounded worker pipeline - front and back are bound together"""
+        plan = self._with_enabled_steps(plan)
+        
+        async def run(i: int, pair: Dict) -> PairResult:
+            self.log_event("processing_card", "processing", card=f"pair {i+1}")
+            return await self._process_single_pair(pair, plan, i)
         
-        for i, pair in enumerate(card_pairs):
-            self.log_thought(f"Processing card pair {i+1}/{len(card_pairs)}", "processing")
-            if i > 0:
-                self.log_thought(f"Moving on to card pair {i+1} of {len(card_pairs)}...", "processing")
-            pair_result = await self._process_single_pair(pair, plan, i)
-            results.append(pair_result)
-            if i < len(card_pairs) - 1:
-                self.log_thought(f"Card pair {i+1} is done! Let me examine the next one...", "success")
+        outcomes = await self._run_pipeline(card_pairs, run)
+        return self._collect_results(outcomes, pairs=True)
+    
+    async def _run_pipeline(self, items: List[Dict], run: Callable[[int, Dict], Awaitable[PairResult]]) -> List[Any]:
+        """Feed items through a bounded queue to a fixed pool of workers
         
+        At most self.max_concurrent_cards items are in flight and at most as many more are
+        queued, so a large batch keeps the tools busy without starting every card at once.
+        Returns outcomes in input order; exceptions are returned, not raised.
+        """
+        worker_count = max(1, min(self.max_concurrent_cards, len(items)))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=worker_count)
+        outcomes: List[Any] = [None] * len(items)
+        started = time.perf_counter()
+        
+        async def produce():
+            for i, item in enumerate(items):
+                await queue.put((i, item))
+            for _ in range(worker_count):
+                await queue.put(None)
+        
+        async def work():
+            while (entry := await queue.get()) is not None:
+                i, item = entry
+                item_started = time.perf_counter()
+                try:
+                    outcomes[i] = await run(i, item)
+                except Exception as e:
+                    outcomes[i] = e
+                logger.debug("Item %d finished in %.2fs", i, time.perf_counter() - item_started)
+        
+        await asyncio.gather(produce(), *[work() for _ in range(worker_count)])
+        
+        elapsed = time.perf_counter() - started
+        if items:
+            logger.info("Processed %d item(s) in %.2fs (%.2f items/s, %d workers)", len(items), elapsed, len(items) / elapsed, worker_count)
+        return outcomes
+    
+    def _with_enabled_steps(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of the plan with its enabled steps filtered once for the whole batch"""
+        return {**plan, "_enabled_steps": [step for step in plan["steps"] if step["enabled"]]}
+    
+    def _collect_results(self, outcomes: List[Any], pairs: bool) -> List[PairResult]:
+        """Turn gathered outcomes (in input order) into results, converting exceptions into error results"""
+        label = "Card pair" if pairs else "Card"
+        results = []
+        for i, outcome in enumerate(outcomes):
+            if isinstance(outcome, BaseException):
+                error_msg = f"Processing failed: {str(outcome)}"
+                self.log_thought(f"{label} {i+1}: {error_msg}", "error")
+                outcome = PairResult(card_index=i, pair_index=i if pairs else None, errors=[error_msg])
+            results.append(outcome)
         return results
     
-    async def _process_single_pair(self, pair: Dict, plan: Dict[str, Any], pair_index: int) -> Dict[str, Any]:
+    async def _process_single_pair(self, pair: Dict, plan: Dict[str, Any], pair_index: int) -> PairResult:
         """Process a single card pair (front + back) following the plan"""
         front_data = pair.get("front", {})
         back_data = pair.get("back", {})
@@ -127,62 +220,40 @@ class AIAgent:
         # Validate initial image data
         if not front_image:
             self.log_thought(f"Card pair {pair_index+1}: No front image data provided", "error")
-            return {
-                "card_index": pair_index,
-                "pair_index": pair_index,
-                "steps_completed": [],
-                "results": {},
-                "errors": ["No front image data provided"],
-                "agent_thoughts": []
-            }
+            return PairResult(card_index=pair_index, pair_index=pair_index, errors=["No front image data provided"])
         
         if not back_image:
             self.log_thought(f"Card pair {pair_index+1}: No back image data provided", "error")
-            return {
-                "card_index": pair_index,
-                "pair_index": pair_index,
-                "steps_completed": [],
-                "results": {},
-                "errors": ["No back image data provided"],
-                "agent_thoughts": []
-            }
-        
-        # Process front image (full processing including identification)
+            return PairResult(card_index=pair_index, pair_index=pair_index, errors=["No back image data provided"])
+        
+        # Front (full processing including identification) and back (skip identification -
+        # all backs look the same) share no data until merge, so examine both at once
         self.log_thought(f"Card pair {pair_index+1}: Ah yes! Let me begin by carefully examining the front of this card...", "step")
         self.log_thought(f"Card pair {pair_index+1} (front): Looking at the front of the card first - this is where I'll identify the Pokémon!", "step")
-        
-        front_processor = CardProcessor(self.mcp_client, self.thought_logger, pair_index, "front")
-        front_result = await front_processor.process_card_image(front_image, plan, should_identify=True)
-        
-        # Process back image (skip identification - all backs look the same)
         self.log_thought(f"Card pair {pair_index+1}: Excellent! Now let me flip this card over and examine the back side...", "step")
         self.log_thought(f"Card pair {pair_index+1} (back): Turning the card over... Looking at the back of the card now - all card backs look the same, so I won't need to identify this one!", "step")
         
-        back_processor = CardProcessor(self.mcp_client, self.thought_logger, pair_index, "back")
-        back_result = await back_processor.process_card_image(back_image, plan, should_identify=False)
+        front_result, back_result = await asyncio.gather(
+            self.card_processor.process_card_image(front_image, plan, pair_index, "front", should_identify=True),
+            self.card_processor.process_card_image(back_image, plan, pair_index, "back", should_identify=False)
+        )
         
         # Merge results using pair processor
         pair_result = self.pair_processor.merge_pair_results(front_result, back_result, pair_index)
         
         return pair_result
     
-    async def _process_single_card(self, card: Dict, plan: Dict[str, Any], card_index: int) -> Dict[str, Any]:
+    async def _process_single_card(self, card: Dict, plan: Dict[str, Any], card_index: int) -> PairResult:
         """Process a single card following the plan (legacy method)"""
         # Legacy single card processing - simplified for now
         # You may want to fully implement this if single card processing is still needed
-        card_result = {
-            "card_index": card_index,
-            "steps_completed": [],
-            "results": {},
-            "errors": [],
-            "agent_thoughts": []
-        }
+        card_result = PairResult(card_index=card_index)
         
         current_image = card.get("image_bytes")
         
         # Validate initial image data
         if not current_image:
-            card_result["errors"].append("No image data provided for card")
+            card_result.errors.append("No image data provided for card")
             self.log_thought(f"Card {card_index+1}: No image data provided", "error")
             return card_result
         
@@ -190,24 +261,25 @@ class AIAgent:
         self.log_thought(f"Card {card_index+1}: Single card processing not fully implemented in refactor", "error")
         return card_result
     
-    async def _generate_summary(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def _generate_summary(self, results: List[PairResult]) -> Dict[str, Any]:
         """Generate final summary of processing results"""
         total_cards = len(results)
-        successful = len([r for r in results if not r["errors"]])
-        failed = total_cards - successful
         
-        # Count completed steps
-        step_counts = {}
+        # Count successes and completed steps in a single pass
+        successful = 0
+        step_counts = Counter()
         for result in results:
-            for step in result["steps_completed"]:
-                step_counts[step] = step_counts.get(step, 0) + 1
+            if not result.errors:
+                successful += 1
+            step_counts.update(result.steps_completed)
+        failed = total_cards - successful
         
         summary = {
             "total_cards": total_cards,
             "successful": successful,
             "failed": failed,
             "success_rate": f"{(successful/total_cards)*100:.1f}%" if total_cards > 0 else "0%",
-            "steps_completed": step_counts,
+            "steps_completed": dict(step_counts),
             "ready_for_ebay": successful,
             "needs_manual_review": failed
         }
@@ -1,128 +1,246 @@
 """
 Card image processing orchestrator
 """
-import base64
-from typing import Any, Dict
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from core.settings import settings
+from .results import CardResult
 from .step_processors import StepProcessor
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class StepSpec:
+    """How the orchestrator runs one plan step"""
+    # Called as run(step_processor, image, card_result, should_identify)
+    run: Callable[[StepProcessor, bytes, CardResult, bool], Awaitable[Any]]
+    # Professor Oak-style thought logged when the step starts ({card_type} is filled in)
+    message: str
+    # Input image: "current" (output of the image chain so far), "original", or None (results only)
+    image: Optional[str] = "current"
+    # run returns (new_image, changed) and the new image feeds the next step in the chain;
+    # other steps that take the current image only read it, so they fork off the chain rather than block it
+    updates_image: bool = False
+    # Op name when the step is fused into one process_card_batch call
+    fused_op: Optional[str] = None
+
+
+STEP_SPECS: Dict[str, StepSpec] = {
+    "check_orientation": StepSpec(
+        run=lambda sp, image, card_result, _: sp.process_orientation(image, card_result),
+        message="Looking at the {card_type} of this card... First, let me check if it's properly oriented!",
+        updates_image=True,
+    ),
+    "remove_background": StepSpec(
+        run=lambda sp, image, card_result, _: sp.process_background_removal(image, card_result),
+        message="Still examining the {card_type}... Now I'll remove the background so I can see it more clearly!",
+        updates_image=True,
+    ),
+    "identify_card": StepSpec(
+        run=lambda sp, image, card_result, should_identify: sp.process_identification(image, card_result, should_identify),
+        message="Looking closely at the {card_type}... This is the exciting part - let me identify which Pokémon this is!",
+        fused_op="identify",
+    ),
+    "grade_card": StepSpec(
+        # Use original image for grading - Ximilar needs original image with context
+        run=lambda sp, image, card_result, _: sp.process_grading(image, card_result),
+        message="Examining the {card_type} carefully... Now I'll assess the condition - checking corners, edges, and surface quality!",
+        image="original",
+        fused_op="grade",
+    ),
+    "enhance_image": StepSpec(
+        run=lambda sp, image, card_result, _: sp.process_enhancement(image, card_result),
+        message="Looking at the {card_type}... Let me enhance the image quality for better examination!",
+        updates_image=True,
+        fused_op="enhance",
+    ),
+    "generate_description": StepSpec(
+        run=lambda sp, image, card_result, _: sp.process_description(card_result),
+        message="Working on the {card_type}... {reason}",
+        image=None,
+    ),
+}
+
 
 class CardProcessor:
-    """Orchestrates processing of a single card image"""
+    """Orchestrates processing of a single card image
+    
+    Holds no per-card state, so one instance is shared by every card in a batch.
+    """
     
-    def __init__(self, mcp_client, thought_logger, pair_index: int, card_type: str):
+    def __init__(self, mcp_client, thought_logger):
         self.mcp_client = mcp_client
         self.thought_logger = thought_logger
-        self.pair_index = pair_index
-        self.card_type = card_type
-        self.step_processor = StepProcessor(mcp_client, thought_logger, pair_index, card_type)
     
     async def process_card_image(
         self, 
         image_bytes: bytes, 
         plan: Dict[str, Any], 
+        pair_index: int,
+        card_type: str,
         should_identify: bool = True
-    ) -> Dict[str, Any]:
-        """Process a single card image (front or back) following the plan"""
-        card_result = {
-            "steps_completed": [],
-            "results": {},
-            "errors": []
-        }
+    ) -> CardResult:
+        """Process a single card image (front or back) following the plan
+        
+        Every enabled step runs as its own task as soon as its inputs are ready:
+        - image-transforming steps form a chain in plan order, each on the previous one's output
+        - read-only steps (identification) take the image as it stands at their point in the chain
+        - grading uses the original image, so it starts straight away
+        - description generation needs identification and grade results only, so it
+          overlaps whatever is left of the image chain (typically enhancement)
+        
+        With settings.fuse_card_tools, identification, grading and enhancement are sent
+        as one process_card_batch call at the end of the image chain instead.
+        Expects plan["_enabled_steps"], pre-filtered once per batch by the agent.
+        """
+        card_result = CardResult()
         
-        current_image = image_bytes
         original_image = image_bytes  # Keep original for grading (Ximilar needs original image)
+        step_processor = StepProcessor(self.mcp_client, self.thought_logger, pair_index, card_type)
         
-        print(f"🔍 DEBUG: Processing {self.card_type} card, should_identify={should_identify}")
-        print(f"🔍 DEBUG: Plan steps: {[(s['name'], s['enabled']) for s in plan['steps']]}")
+        logger.debug("Processing %s card, should_identify=%s", card_type, should_identify)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Plan steps: %s", [(s["name"], s["enabled"]) for s in plan["steps"]])
         
-        for step in plan["steps"]:
-            if not step["enabled"]:
-                print(f"🔍 DEBUG: Skipping disabled step: {step['name']}")
-                continue
-            
-            step_name = step["name"]
-            print(f"🔍 DEBUG: Processing step: {step_name} for {self.card_type}")
-            
-            # Skip identification for back images
-            if step_name == "identify_card" and not should_identify:
-                print(f"🔍 DEBUG: Skipping identification for {self.card_type} (should_identify=False)")
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the back of this card... All card backs look the same, so I don't need to identify it!", 
-                    "step"
-                )
-                continue
-            
-            # More descriptive Professor Oak-style messages for each step
-            if step_name == "check_orientation":
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the {self.card_type} of this card... First, let me check if it's properly oriented!", 
-                    "step"
-                )
-            elif step_name == "remove_background":
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Still examining the {self.card_type}... Now I'll remove the background so I can see it more clearly!", 
-                    "step"
-                )
-            elif step_name == "identify_card":
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Looking closely at the {self.card_type}... This is the exciting part - let me identify which Pokémon this is!", 
-                    "step"
-                )
-            elif step_name == "grade_card":
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Examining the {self.card_type} carefully... Now I'll assess the condition - checking corners, edges, and surface quality!", 
-                    "step"
-                )
-            elif step_name == "enhance_image":
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the {self.card_type}... Let me enhance the image quality for better examination!", 
-                    "step"
-                )
-            else:
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Working on the {self.card_type}... {step['reason']}", 
-                    "step"
-                )
+        fused_steps = self._fusable_steps(plan["_enabled_steps"], card_type, should_identify) if settings.fuse_card_tools else []
+        
+        def run(step, image_task, deps=()):
+            return tg.create_task(self._run_step_after(
+                step_processor, step, image_task, deps, image_bytes, original_image, card_result, should_identify
+            ))
+        
+        async with asyncio.TaskGroup() as tg:
+            image_task = None  # Task producing the current image (None: the input image)
+            result_tasks = []  # Tasks producing results that description generation needs
+            description_steps = []
+            for step in plan["_enabled_steps"]:
+                if step in fused_steps:
+                    continue
+                spec = STEP_SPECS.get(step["name"])
+                if spec is None or spec.updates_image:
+                    image_task = run(step, image_task)
+                elif spec.image is None:
+                    description_steps.append(step)
+                elif spec.image == "original":
+                    result_tasks.append(run(step, None))
+                else:
+                    result_tasks.append(run(step, image_task))
             
-            try:
-                if step_name == "check_orientation":
-                    current_image, success = await self.step_processor.process_orientation(current_image, card_result)
-                    if not success:
-                        continue
-                
-                elif step_name == "remove_background":
-                    current_image, success = await self.step_processor.process_background_removal(current_image, card_result)
-                    if not success:
-                        continue
-                
-                elif step_name == "identify_card":
-                    success = await self.step_processor.process_identification(current_image, card_result, should_identify)
-                    if not success:
-                        continue
-                
-                elif step_name == "grade_card":
-                    # Use original image for grading - Ximilar needs original image with context
-                    success = await self.step_processor.process_grading(original_image, card_result)
-                    if not success:
-                        continue
-                
-                elif step_name == "enhance_image":
-                    current_image, success = await self.step_processor.process_enhancement(current_image, card_result)
-                    if not success:
-                        continue
-                
-                elif step_name == "generate_description":
-                    success = await self.step_processor.process_description(card_result)
-                    if not success:
-                        continue
+            if fused_steps:
+                result_tasks.append(tg.create_task(
+                    self._run_fused(step_processor, fused_steps, image_task, original_image, card_result)
+                ))
             
-            except Exception as e:
-                error_msg = f"Step {step_name} failed: {str(e)}"
-                card_result["errors"].append(error_msg)
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): {error_msg}", 
-                    "error"
-                )
+            for step in description_steps:
+                run(step, None, result_tasks)
         
+        # Only the base64 form is needed from here on, so don't hold every decoded image until the batch ends
+        card_result.release_images()
         return card_result
-
+    
+    async def _run_step_after(
+        self,
+        step_processor: StepProcessor,
+        step: Dict[str, Any],
+        image_task: Optional[asyncio.Task],
+        deps: Sequence[asyncio.Task],
+        image_bytes: bytes,
+        original_image: bytes,
+        card_result: CardResult,
+        should_identify: bool
+    ) -> bytes:
+        """Run a plan step once the steps it depends on have finished"""
+        if deps:
+            await asyncio.wait(deps)
+        current_image = await image_task if image_task is not None else image_bytes
+        return await self._run_step(step_processor, step, current_image, original_image, card_result, should_identify)
+    
+    async def _run_step(
+        self,
+        step_processor: StepProcessor,
+        step: Dict[str, Any],
+        current_image: bytes,
+        original_image: bytes,
+        card_result: CardResult,
+        should_identify: bool
+    ) -> bytes:
+        """Run a single plan step and return the (possibly updated) current image"""
+        step_name = step["name"]
+        card_type = step_processor.card_type
+        logger.debug("Processing step: %s for %s", step_name, card_type)
+        
+        # Skip identification for back images
+        if step_name == "identify_card" and not should_identify:
+            logger.debug("Skipping identification for %s (should_identify=False)", card_type)
+            self.thought_logger.log_thought(
+                f"{step_processor.prefix}Looking at the back of this card... All card backs look the same, so I don't need to identify it!", 
+                "step"
+            )
+            return current_image
+        
+        self._log_step_start(step_processor, step)
+        
+        spec = STEP_SPECS.get(step_name)
+        if spec is None:
+            return current_image
+        
+        try:
+            image = original_image if spec.image == "original" else current_image
+            result = await spec.run(step_processor, image, card_result, should_identify)
+            if spec.updates_image:
+                current_image, _ = result
+        
+        except Exception as e:
+            error_msg = f"Step {step_name} failed: {str(e)}"
+            card_result.errors.append(error_msg)
+            self.thought_logger.log_thought(
+                f"{step_processor.prefix}{error_msg}", 
+                "error"
+            )
+        
+        return current_image
+    
+    def _fusable_steps(self, steps: List[Dict[str, Any]], card_type: str, should_identify: bool) -> List[Dict[str, Any]]:
+        """Enabled steps worth fusing into one tool call (at least two that would call a tool)"""
+        fusable = [
+            step for step in steps
+            if step["name"] in STEP_SPECS and STEP_SPECS[step["name"]].fused_op
+            and not (step["name"] == "identify_card" and not should_identify)
+            and not (step["name"] == "enhance_image" and card_type == "back")
+        ]
+        return fusable if len(fusable) >= 2 else []
+    
+    async def _run_fused(
+        self,
+        step_processor: StepProcessor,
+        steps: List[Dict[str, Any]],
+        image_task: Optional[asyncio.Task],
+        original_image: bytes,
+        card_result: CardResult
+    ) -> bytes:
+        """Run fused steps as one process_card_batch call, after the image chain, and return the (possibly updated) current image"""
+        current_image = await image_task if image_task is not None else original_image
+        for step in steps:
+            self._log_step_start(step_processor, step)
+        
+        try:
+            return await step_processor.process_card_batch(
+                current_image, original_image, card_result, [STEP_SPECS[step["name"]].fused_op for step in steps]
+            )
+        except Exception as e:
+            error_msg = f"Step process_card_batch failed: {str(e)}"
+            card_result.errors.append(error_msg)
+            self.thought_logger.log_thought(
+                f"{step_processor.prefix}{error_msg}", 
+                "error"
+            )
+            return current_image
+    
+    def _log_step_start(self, step_processor: StepProcessor, step: Dict[str, Any]):
+        spec = STEP_SPECS.get(step["name"])
+        template = spec.message if spec else "Working on the {card_type}... {reason}"
+        message = template.format(card_type=step_processor.card_type, reason=step.get("reason", ""))
+        self.thought_logger.log_thought(f"{step_processor.prefix}{message}", "step")
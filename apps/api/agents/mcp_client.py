@@ -2,79 +2,338 @@
 MCP Client for calling MCP tools
 """
 import asyncio
-import base64
+import copy
+import hashlib
+import logging
+import time
 import httpx
-from typing import Any, Dict
+import orjson
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from core.settings import settings
+from .results import ImagePayload
+
+logger = logging.getLogger(__name__)
+
+# Successful image tool results keyed by image content + method + other params.
+# Shared across clients (a fresh AIAgent is created for every async batch), LRU-evicted
+# past both an entry count and a total size. Entries share their images' bytes with the
+# results handed out, so cached images stay in memory until evicted.
+_result_cache: "OrderedDict[str, Tuple[float, Dict[str, Any], int]]" = OrderedDict()
+_result_cache_bytes = 0
+
+# Image-producing tools and the result field holding their output image. They are called
+# through the server's /mcp/raw endpoint, so the image is never base64 in either direction.
+IMAGE_RESULT_FIELDS = {
+    "rotate_image": "rotated_image",
+    "remove_background": "processed_image",
+    "enhance_image": "enhanced_image",
+}
+
+
+# process_card_batch op name -> the single tool it stands for
+CARD_BATCH_OPS = {"identify": "identify_card", "grade": "grade_card", "enhance": "enhance_image"}
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_OCTET_STREAM_HEADERS = {"Content-Type": "application/octet-stream"}
+
+# Binary params and the multipart file field each is uploaded as
+FILE_PARAMS = {"image_bytes": "image", "original_bytes": "original"}
+
+
+def _decode_images(method: str, tool_result: Dict[str, Any]):
+    """Turn base64 image fields of a tool result into ImagePayloads, in place"""
+    if method == "process_card_batch":
+        for op, op_result in tool_result.get("results", {}).items():
+            _decode_images(CARD_BATCH_OPS.get(op, op), op_result)
+        return
+    image_field = IMAGE_RESULT_FIELDS.get(method)
+    if image_field and isinstance(tool_result.get(image_field), str):
+        # Decode once here; steps pass .raw on and serialization reuses the original string
+        tool_result[image_field] = ImagePayload.from_b64(tool_result[image_field])
+
+
+def _cache_key(method: str, digests: Dict[str, str], params_json: bytes) -> str:
+    """Build a content-addressed cache key for an image tool call"""
+    image_hash = ":".join(digests[name][:16] for name in sorted(digests))
+    params_hash = hashlib.md5(params_json).hexdigest()
+    return f"{image_hash}:{method}:{params_hash}"
+
+
+# sha256 of recently sent images by object identity. The same bytes object usually goes to
+# several tools (the original image to orientation and grading, a chain output to the next
+# step and to identification), so it is hashed once. Entries hold a reference to the bytes,
+# so an id can't be reused by another object while its entry exists.
+_digest_memo: "OrderedDict[int, Tuple[bytes, str]]" = OrderedDict()
+_DIGEST_MEMO_MAX_ENTRIES = 32
+
+
+def _digest(data: bytes) -> str:
+    entry = _digest_memo.get(id(data))
+    if entry is not None:
+        _digest_memo.move_to_end(id(data))
+        return entry[1]
+    digest = hashlib.sha256(data).hexdigest()
+    _digest_memo[id(data)] = (data, digest)
+    while len(_digest_memo) > _DIGEST_MEMO_MAX_ENTRIES:
+        _digest_memo.popitem(last=False)
+    return digest
+
+
+def _image_nbytes(value: Any) -> int:
+    """Bytes held by the ImagePayloads in a (nested) tool result"""
+    if isinstance(value, ImagePayload):
+        return len(value.raw) + len(value._b64 or "")
+    if isinstance(value, dict):
+        return sum(_image_nbytes(v) for v in value.values())
+    return 0
+
+
+def _cache_evict(key: str):
+    global _result_cache_bytes
+    _, _, nbytes = _result_cache.pop(key)
+    _result_cache_bytes -= nbytes
+
+
+def _cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached result if present and not expired"""
+    entry = _result_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, result, _ = entry
+    if time.monotonic() - stored_at > settings.mcp_cache_ttl:
+        _cache_evict(key)
+        return None
+    _result_cache.move_to_end(key)
+    return copy.deepcopy(result)
+
+
+def _cache_put(key: str, result: Dict[str, Any]):
+    """Store a result, evicting the least recently used entries past the count and size limits"""
+    global _result_cache_bytes
+    nbytes = _image_nbytes(result)
+    if nbytes > settings.mcp_cache_max_bytes:
+        return
+    if key in _result_cache:
+        _cache_evict(key)
+    _result_cache[key] = (time.monotonic(), copy.deepcopy(result), nbytes)
+    _result_cache_bytes += nbytes
+    while len(_result_cache) > settings.mcp_cache_max_entries or _result_cache_bytes > settings.mcp_cache_max_bytes:
+        _cache_evict(next(iter(_result_cache)))
+
+
+# sha256 digests of images already uploaded to the MCP server, which keeps them (LRU) so
+# later calls can send the digest as a ref instead of the bytes. If the server has since
+# evicted one it says so, and the image is uploaded again.
+_uploaded_images: "OrderedDict[str, None]" = OrderedDict()
+
+# Error prefix the MCP server uses for an evicted or unknown image ref
+UNKNOWN_IMAGE_REF = "Unknown image ref"
+
+
+def _remember_uploaded(digests):
+    for digest in digests:
+        _uploaded_images[digest] = None
+        _uploaded_images.move_to_end(digest)
+    while len(_uploaded_images) > settings.mcp_image_store_max_entries:
+        _uploaded_images.popitem(last=False)
+
+
+# Use host.docker.internal to reach the host machine from Docker
+MCP_BASE_URL = "http://host.docker.internal:8001"  # MCP Server URL
+
+# One pooled HTTP client for the whole process, so every agent (including the fresh one
+# created per async batch) reuses the same kept-alive connections
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared MCP HTTP client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=MCP_BASE_URL,
+            http2=True,
+            timeout=120.0,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        )
+    return _http_client
+
+
+async def warmup_http_client():
+    """Open a connection to the MCP server ahead of the first tool call"""
+    try:
+        await get_http_client().get("/mcp/tools")
+    except httpx.HTTPError as e:
+        logger.info("MCP server warmup failed (will connect on first call): %s", e)
+
+
+async def close_http_client():
+    """Close the shared MCP HTTP client (on shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 class MCPClient:
     """Client for calling MCP tools"""
     
     def __init__(self, thought_logger):
-        # Use host.docker.internal to reach the host machine from Docker
-        self.mcp_base_url = "http://host.docker.internal:8001"  # MCP Server URL
+        self.mcp_base_url = MCP_BASE_URL
         self.thought_logger = thought_logger
     
-    async def call_tool(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Call MCP tool and return result"""
+    @property
+    def _client(self) -> httpx.AsyncClient:
+        return get_http_client()
+    
+    async def call_tool(self, method: str, params: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+        """Call MCP tool and return result
+        
+        Successful image tool results are cached by image content, so the same image
+        is never sent through the same tool twice while the cache entry is fresh.
+        """
+        progress_task = None
         try:
-            self.thought_logger.log_thought(f"Calling MCP tool: {method}", "step")
-            print(f"🔧 Calling MCP tool: {method} with params: {list(params.keys())}")
+            self.thought_logger.log_event("tool_call", "step", tool=method)
+            logger.debug("Calling MCP tool: %s with params: %s", method, list(params))
+            
+            image_bytes = params.get("image_bytes")
+            files = {k: v for k, v in params.items() if k in FILE_PARAMS and isinstance(v, bytes)}
+            other_params = {k: v for k, v in params.items() if k not in files}
+            digests = {k: _digest(v) for k, v in files.items()}
+            # Serialized once: it is both hashed into the cache key and sent as the params form field
+            params_json = orjson.dumps(other_params, option=orjson.OPT_SORT_KEYS) if files else b""
+            cache_key = None
+            if use_cache and isinstance(image_bytes, bytes):
+                cache_key = _cache_key(method, digests, params_json)
+                cached = _cache_get(cache_key)
+                if cached is not None:
+                    logger.debug("MCP tool %s served from cache", method)
+                    return cached
             
             # Add intermediate thoughts for long-running operations
             if method in ["remove_background", "identify_card"]:
                 self.thought_logger.log_thought(f"Processing... This may take a moment. Please be patient!", "step")
             
-            # Convert image_bytes to base64 if present
-            if "image_bytes" in params and isinstance(params["image_bytes"], bytes):
-                params["image_bytes"] = base64.b64encode(params["image_bytes"]).decode('utf-8')
-                print(f"🔧 DEBUG: Converted image_bytes to base64, length: {len(params['image_bytes'])}")
-            
-            print(f"🔧 DEBUG: About to call MCP server at {self.mcp_base_url}/mcp/call")
+            logger.debug("About to call MCP server at %s", self.mcp_base_url)
             
             # Add progress thoughts for long operations
             if method == "remove_background":
-                asyncio.create_task(self._add_background_progress_thoughts())
+                progress_task = asyncio.create_task(self._add_background_progress_thoughts())
             elif method == "identify_card":
-                asyncio.create_task(self._add_identification_progress_thoughts())
+                progress_task = asyncio.create_task(self._add_identification_progress_thoughts())
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.mcp_base_url}/mcp/call",
-                    json={"method": method, "params": params},
-                    timeout=120.0
+            if method in IMAGE_RESULT_FIELDS and set(files) == {"image_bytes"}:
+                result = await self._post_raw(method, image_bytes, digests["image_bytes"], other_params)
+            elif isinstance(image_bytes, bytes):
+                result = await self._post_images(method, files, digests, params_json)
+            else:
+                # orjson rather than httpx's stdlib encoder: faster, and bytes straight to the wire
+                response = await self._client.post(
+                    "/mcp/call",
+                    content=orjson.dumps({"method": method, "params": params}),
+                    headers=_JSON_HEADERS
                 )
-                print(f"🔧 DEBUG: MCP response status: {response.status_code}")
-                result = response.json()
-                print(f"🔧 DEBUG: MCP response: {result}")
-                
-                if result.get("error"):
-                    raise Exception(f"MCP Error: {result['error']}")
-                
-                print(f"✅ MCP tool {method} completed successfully")
-                return result.get("result", {})
+                logger.debug("MCP response status: %s", response.status_code)
+                result = orjson.loads(response.content)
+            logger.debug("MCP response: %s", result)
+            
+            if result.get("error"):
+                raise Exception(f"MCP Error: {result['error']}")
+            
+            logger.debug("MCP tool %s completed successfully", method)
+            tool_result = result.get("result", {})
+            _decode_images(method, tool_result)
+            if cache_key and tool_result.get("success"):
+                _cache_put(cache_key, tool_result)
+            return tool_result
         
         except Exception as e:
             self.thought_logger.log_thought(f"Error calling MCP tool {method}: {str(e)}", "error")
-            print(f"❌ MCP tool {method} failed: {str(e)}")
+            logger.warning("MCP tool %s failed: %s", method, e)
             raise
+        
+        finally:
+            # Don't let "still working" thoughts arrive after the tool has finished
+            if progress_task and not progress_task.done():
+                progress_task.cancel()
+    
+    async def _post_images(
+        self, method: str, files: Dict[str, bytes], digests: Dict[str, str], params_json: bytes
+    ) -> Dict[str, Any]:
+        """Call an image tool, uploading raw multipart bytes (no base64) or refs for images the server already has"""
+        known = {k for k in files if digests[k] in _uploaded_images}
+        while True:
+            response = await self._client.post(
+                f"/mcp/call/{method}",
+                files={FILE_PARAMS[k]: ("card", v, "application/octet-stream") for k, v in files.items() if k not in known},
+                data={"params": params_json.decode(), **{f"{FILE_PARAMS[k]}_ref": digests[k] for k in known}}
+            )
+            logger.debug("MCP response status: %s", response.status_code)
+            result = orjson.loads(response.content)
+            if known and str(result.get("error") or "").startswith(UNKNOWN_IMAGE_REF):
+                # The server evicted an image; forget the refs and upload the bytes
+                logger.debug("MCP server no longer has an image for %s, re-uploading", method)
+                for k in known:
+                    _uploaded_images.pop(digests[k], None)
+                known = set()
+                continue
+            _remember_uploaded(digests.values())
+            return result
+    
+    async def _post_raw(
+        self, method: str, image_bytes: bytes, digest: str, query: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Call an image-producing tool with the image as the raw request body (or a ref); the response body is the output image"""
+        known = digest in _uploaded_images
+        while True:
+            response = await self._client.post(
+                f"/mcp/raw/{method}",
+                content=b"" if known else image_bytes,
+                params={**query, "image_ref": digest} if known else query,
+                headers=_OCTET_STREAM_HEADERS
+            )
+            logger.debug("MCP response status: %s", response.status_code)
+            if response.status_code != 200:
+                try:
+                    detail = orjson.loads(response.content).get("detail")
+                except orjson.JSONDecodeError:
+                    detail = response.text
+                if known and str(detail).startswith(UNKNOWN_IMAGE_REF):
+                    # The server evicted the image; forget the ref and upload the bytes
+                    logger.debug("MCP server no longer has an image for %s, re-uploading", method)
+                    _uploaded_images.pop(digest, None)
+                    known = False
+                    continue
+                if response.status_code == 502:
+                    # The tool itself failed: an unsuccessful result, as the JSON endpoint returns
+                    return {"result": {"success": False, "error": detail}}
+                return {"error": detail or f"HTTP {response.status_code}"}
+            _remember_uploaded([digest])
+            # Same shape as the JSON endpoint's result, with the image already as bytes
+            return {"result": {"success": True, IMAGE_RESULT_FIELDS[method]: ImagePayload(raw=response.content)}}
     
     async def _add_background_progress_thoughts(self):
-        """Add intermediate thoughts during background removal"""
-        await asyncio.sleep(2)
-        if self.thought_logger.session_id:
-            self.thought_logger.log_thought("Still working on removing that background... almost there!", "step")
-        await asyncio.sleep(3)
-        if self.thought_logger.session_id:
-            self.thought_logger.log_thought("The background removal is taking a bit longer, but we're making progress!", "step")
+        """Add intermediate thoughts during background removal (cancelled once the tool returns)"""
+        try:
+            await asyncio.sleep(2)
+            if self.thought_logger.session_id:
+                self.thought_logger.log_thought("Still working on removing that background... almost there!", "step")
+            await asyncio.sleep(3)
+            if self.thought_logger.session_id:
+                self.thought_logger.log_thought("The background removal is taking a bit longer, but we're making progress!", "step")
+        except asyncio.CancelledError:
+            pass
     
     async def _add_identification_progress_thoughts(self):
-        """Add intermediate thoughts during card identification"""
-        await asyncio.sleep(2)
-        if self.thought_logger.session_id:
-            self.thought_logger.log_thought("Searching through my database... there are so many Pokémon to check!", "step")
-        await asyncio.sleep(3)
-        if self.thought_logger.session_id:
-            self.thought_logger.log_thought("Still analyzing... I want to make sure I identify this correctly!", "step")
-
+        """Add intermediate thoughts during card identification (cancelled once the tool returns)"""
+        try:
+            await asyncio.sleep(2)
+            if self.thought_logger.session_id:
+                self.thought_logger.log_thought("Searching through my database... there are so many Pokémon to check!", "step")
+            await asyncio.sleep(3)
+            if self.thought_logger.session_id:
+                self.thought_logger.log_thought("Still analyzing... I want to make sure I identify this correctly!", "step")
+        except asyncio.CancelledError:
+            pass
@@ -2,6 +2,11 @@
 Pair processing logic for card pairs (front + back)
 """
 from typing import Any, Dict
+import numpy as np
+from .results import CardResult, PairResult
+
+# Numeric grade components that are averaged across front and back
+NUMERIC_GRADE_FIELDS = ("corners", "edges", "surface", "centering", "final")
 
 
 class PairProcessor:
@@ -25,20 +30,23 @@ class PairProcessor:
         front_grades = front_records[0].get("grades", {})
         back_grades = back_records[0].get("grades", {})
         
-        # Average numeric grade components
-        combined_grades = {}
-        numeric_fields = ["corners", "edges", "surface", "centering", "final"]
-        
-        for field in numeric_fields:
-            front_val = front_grades.get(field)
-            back_val = back_grades.get(field)
-            
-            if front_val is not None and back_val is not None:
-                combined_grades[field] = (front_val + back_val) / 2.0
-            elif front_val is not None:
-                combined_grades[field] = front_val
-            elif back_val is not None:
-                combined_grades[field] = back_val
+        # Average numeric grade components in one pass; a component missing on one side
+        # (NaN) falls back to the other side's value, and is omitted if missing on both
+        grades = np.array(
+            [
+                [front_grades.get(f, np.nan) for f in NUMERIC_GRADE_FIELDS],
+                [back_grades.get(f, np.nan) for f in NUMERIC_GRADE_FIELDS],
+            ],
+            dtype=np.float64
+        )
+        present = ~np.isnan(grades)
+        with np.errstate(invalid="ignore"):
+            averages = np.nansum(grades, axis=0) / present.sum(axis=0)
+        combined_grades = {
+            field: float(value)
+            for field, value in zip(NUMERIC_GRADE_FIELDS, averages)
+            if not np.isnan(value)
+        }
         
         # For condition string, use the one from the final grade (or front as fallback)
         combined_grades["condition"] = front_grades.get("condition") or back_grades.get("condition")
@@ -60,65 +68,60 @@ class PairProcessor:
     
     def merge_pair_results(
         self, 
-        front_result: Dict[str, Any], 
-        back_result: Dict[str, Any], 
+        front_result: CardResult, 
+        back_result: CardResult, 
         pair_index: int
-    ) -> Dict[str, Any]:
+    ) -> PairResult:
         """Merge front and back results into a single pair result"""
-        pair_result = {
-            "card_index": pair_index,  # Keep for compatibility
-            "pair_index": pair_index,
-            "steps_completed": [],
-            "results": {
-                "front": {},
-                "back": {}
-            },
-            "errors": [],
-            "agent_thoughts": []
-        }
+        pair_result = PairResult(
+            card_index=pair_index,  # Keep for compatibility
+            pair_index=pair_index,
+            results={
+                "front": front_result.results_dict(),
+                "back": back_result.results_dict()
+            }
+        )
         
         # Merge results
-        pair_result["results"]["front"] = front_result["results"]
-        pair_result["results"]["back"] = back_result["results"]
-        pair_result["steps_completed"].extend([f"front_{s}" for s in front_result["steps_completed"]])
-        pair_result["steps_completed"].extend([f"back_{s}" for s in back_result["steps_completed"]])
-        pair_result["errors"].extend([f"front_{e}" for e in front_result["errors"]])
-        pair_result["errors"].extend([f"back_{e}" for e in back_result["errors"]])
+        pair_result.steps_completed.extend([f"front_{s}" for s in front_result.steps_completed])
+        pair_result.steps_completed.extend([f"back_{s}" for s in back_result.steps_completed])
+        pair_result.errors.extend([f"front_{e}" for e in front_result.errors])
+        pair_result.errors.extend([f"back_{e}" for e in back_result.errors])
         
         # Use front identification for the pair (since we only identify the front)
-        if "identification" in front_result["results"]:
-            pair_result["results"]["identification"] = front_result["results"]["identification"]
+        if front_result.identification is not None:
+            pair_result.results["identification"] = front_result.identification
         
         # Combine front and back grades for the pair
-        front_grade = front_result["results"].get("grade")
-        back_grade = back_result["results"].get("grade")
+        front_grade = front_result.grade
+        back_grade = back_result.grade
         
         if front_grade and back_grade:
             # Combine grades by averaging numeric values
             combined_grade = self.combine_grades(front_grade, back_grade)
-            pair_result["results"]["grade"] = combined_grade
+            pair_result.results["grade"] = combined_grade
             self.thought_logger.log_thought(
                 f"Card pair {pair_index+1}: Combined condition assessment from both front and back - averaging the grades for a complete evaluation!", 
                 "success"
             )
         elif front_grade:
             # If only front grade is available, use it
-            pair_result["results"]["grade"] = front_grade
+            pair_result.results["grade"] = front_grade
             self.thought_logger.log_thought(
                 f"Card pair {pair_index+1}: Using front card's condition grade for the pair.", 
                 "step"
             )
         elif back_grade:
             # If only back grade is available, use it
-            pair_result["results"]["grade"] = back_grade
+            pair_result.results["grade"] = back_grade
             self.thought_logger.log_thought(
                 f"Card pair {pair_index+1}: Using back card's condition grade for the pair.", 
                 "step"
             )
         
         # Use front description for the pair
-        if "listing_description" in front_result["results"]:
-            pair_result["results"]["listing_description"] = front_result["results"]["listing_description"]
+        if front_result.listing_description is not None:
+            pair_result.results["listing_description"] = front_result.listing_description
         
         return pair_result
 
@@ -1,72 +1,192 @@
 """
 Processing plan creation for AI Agent
 """
-import json
-from typing import Any, Dict
+import asyncio
+import copy
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
 from core.settings import settings
-from openai import OpenAI
+import orjson
+from openai import AsyncOpenAI
+
+# Plans only depend on user options, so share them across planner instances
+# (a fresh AIAgent is created for every async batch). LRU-bounded in case callers
+# send option keys beyond the handful of known booleans.
+_plan_cache: "OrderedDict[FrozenSet, Dict[str, Any]]" = OrderedDict()
+_PLAN_CACHE_MAX_ENTRIES = 64
+
+
+def _cache_plan(cache_key: FrozenSet, plan: Dict[str, Any]):
+    """Store a plan, evicting the least recently used past the size limit"""
+    _plan_cache[cache_key] = plan
+    _plan_cache.move_to_end(cache_key)
+    while len(_plan_cache) > _PLAN_CACHE_MAX_ENTRIES:
+        _plan_cache.popitem(last=False)
+
+
+class _PlanRequestBatcher:
+    """Coalesces planner LLM calls from concurrent sessions
+    
+    Requests are buffered for a short window (or until max_batch are waiting); each
+    distinct set of user options then gets exactly one LLM call, issued concurrently,
+    and every waiter receives its own copy of the result.
+    """
+    
+    def __init__(self, window: float = 0.05, max_batch: int = 16):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[FrozenSet, List[Tuple[Callable[[], Awaitable[Any]], asyncio.Future]]] = {}
+        self._pending_count = 0
+        self._flush_handle = None
+        # Running LLM calls; the event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def submit(self, key: FrozenSet, request_plan: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append((request_plan, future))
+        self._pending_count += 1
+        
+        if self._pending_count >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        self._pending_count = 0
+        for waiters in pending.values():
+            task = asyncio.ensure_future(self._run(waiters))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, waiters):
+        request_plan = waiters[0][0]
+        try:
+            plan = await request_plan()
+        except Exception as e:
+            for _, future in waiters:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in waiters:
+            if not future.done():
+                future.set_result(copy.deepcopy(plan))
+
+
+_plan_batcher = _PlanRequestBatcher()
+
+# Planner prompts. Everything that never changes comes first so requests share a byte-identical
+# prefix (what provider-side prompt caching keys on); only the user options are appended.
+_PLAN_SYSTEM_PROMPT = "You are a friendly AI assistant that helps process trading cards. Use simple, conversational language that users can easily understand. Always respond with a single JSON object."
+
+_PLAN_PREFIX = """You are an AI agent processing trading cards. Create a simple, user-friendly processing plan.
+
+Available Tools (ONLY use these):
+- remove_background: Clean up the card image
+- identify_card: Find out what card it is
+- grade_card: Check the card's condition
+- enhance_image: Make the image look better
+- generate_description: Create an eBay listing
+
+Create a simple plan that:
+1. ONLY uses the tools listed above
+2. Follows a logical order (clean → identify → grade → list)
+3. Uses friendly, conversational language
+4. Focuses on what the user will see
+5. Keeps it simple and clear
+
+IMPORTANT: Do NOT include any orientation or rotation steps. Only use the tools listed above.
+
+Return ONLY a JSON object with exactly this schema:
+{"steps": [{"name": str, "enabled": bool, "reason": str}], "reasoning": str}"""
+
+
+def _parse_plan(plan_text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Parse the LLM's plan, tolerating a Markdown code fence; None if it isn't a JSON object"""
+    text = (plan_text or "").strip()
+    if text.startswith("```"):
+        text = text.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+    # Anything else is prose, not a plan - don't pay for a parse error to find that out
+    if not text.startswith("{"):
+        return None
+    try:
+        plan = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None
+    return plan if isinstance(plan, dict) else None
 
 
 class ProcessingPlanner:
     """Handles creation of processing plans"""
     
-    def __init__(self, client: OpenAI, thought_logger):
+    def __init__(self, client: AsyncOpenAI, thought_logger):
         self.client = client
         self.thought_logger = thought_logger
     
     async def create_plan(self, cards: list, user_options: Dict[str, bool]) -> Dict[str, Any]:
-        """Use AI to create an intelligent processing plan"""
-        
-        # Analyze the cards and user requirements
-        analysis_prompt = f"""
-        You are an AI agent processing trading cards. Create a simple, user-friendly processing plan.
-
-        User Options: {user_options}
-        Number of Cards: {len(cards)}
+        """Create a processing plan
         
-        Available Tools (ONLY use these):
-        - remove_background: Clean up the card image
-        - identify_card: Find out what card it is
-        - grade_card: Check the card's condition
-        - enhance_image: Make the image look better
-        - generate_description: Create an eBay listing
+        The deterministic default plan is used unless LLM planning is switched on, for
+        every batch with settings.use_llm_planner or per batch with the "use_llm_planner"
+        option; LLM plans are cached per set of user options.
+        """
+        if not (settings.use_llm_planner or user_options.get("use_llm_planner", False)):
+            return self.default_plan(user_options)
         
-        Create a simple plan that:
-        1. ONLY uses the tools listed above
-        2. Follows a logical order (clean → identify → grade → list)
-        3. Uses friendly, conversational language
-        4. Focuses on what the user will see
-        5. Keeps it simple and clear
+        cache_key = frozenset(user_options.items())
+        cached_plan = _plan_cache.get(cache_key)
+        if cached_plan is not None:
+            _plan_cache.move_to_end(cache_key)
+            return copy.deepcopy(cached_plan)
         
-        IMPORTANT: Do NOT include any orientation or rotation steps. Only use the tools listed above.
+        # The LLM call may be shared with other sessions, so its thought is logged here, to this session
+        plan, (thought, thought_type) = await _plan_batcher.submit(
+            cache_key, lambda: self._request_plan(user_options, cache_key)
+        )
+        self.thought_logger.log_thought(thought, thought_type)
+        return plan
+    
+    async def _request_plan(
+        self, user_options: Dict[str, bool], cache_key: FrozenSet
+    ) -> Tuple[Dict[str, Any], Tuple[str, str]]:
+        """Ask the LLM for a plan, caching it on success and falling back to the default plan
         
-        Return a JSON plan with steps and reasoning.
+        Returns the plan and the (thought, thought type) to log for it.
         """
+        # Fixed instructions first, the per-request part last and in a stable order
+        analysis_prompt = f"{_PLAN_PREFIX}\n\nUser Options: {sorted(user_options.items())}"
         
         try:
-            response = self.client.chat.completions.create(
-                model=settings.llm_model,
+            response = await self.client.chat.completions.create(
+                model=settings.planner_model,
                 messages=[
-                    {"role": "system", "content": "You are a friendly AI assistant that helps process trading cards. Use simple, conversational language that users can easily understand."},
+                    {"role": "system", "content": _PLAN_SYSTEM_PROMPT},
                     {"role": "user", "content": analysis_prompt}
                 ],
-                temperature=0.3
+                temperature=0,
+                max_tokens=300,
+                response_format={"type": "json_object"}
             )
             
             plan_text = response.choices[0].message.content
-            self.thought_logger.log_thought(f"AI created processing plan: {plan_text}", "planning")
+            thought = (f"AI created processing plan: {plan_text}", "planning")
             
             # Parse the plan (fallback to default if parsing fails)
-            try:
-                plan = json.loads(plan_text)
-            except:
-                plan = self.default_plan(user_options)
+            plan = _parse_plan(plan_text)
+            if plan is None:
+                return self.default_plan(user_options), thought
             
-            return plan
+            _cache_plan(cache_key, plan)
+            return plan, thought
             
         except Exception as e:
-            self.thought_logger.log_thought(f"Error creating processing plan: {str(e)}", "error")
-            return self.default_plan(user_options)
+            return self.default_plan(user_options), (f"Error creating processing plan: {str(e)}", "error")
     
     def default_plan(self, user_options: Dict[str, bool]) -> Dict[str, Any]:
         """Default processing plan based on user options"""
@@ -0,0 +1,119 @@
+"""
+Result containers for AI Agent processing
+Converted to plain dicts only at the API boundary
+"""
+import base64
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+try:
+    # SIMD-accelerated base64 (several times faster on multi-MB card images)
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+_b64decode = _b64.b64decode
+_b64encode = _b64.b64encode
+
+
+@dataclass(slots=True)
+class ImagePayload:
+    """Image bytes passed between steps; base64 is produced lazily and only once"""
+    raw: bytes
+    _b64: Optional[str] = None
+    
+    @classmethod
+    def from_b64(cls, b64: str) -> "ImagePayload":
+        """Decode a base64 tool result once, keeping the original string for serialization"""
+        return cls(raw=_b64decode(b64), _b64=b64)
+    
+    @property
+    def b64(self) -> str:
+        if self._b64 is None:
+            self._b64 = _b64encode(self.raw).decode("ascii")
+        return self._b64
+    
+    def release(self):
+        """Drop this payload's reference to the decoded bytes once no later step needs them
+        
+        Only base64 is serialized, so it is kept. The bytes themselves are only freed once
+        nothing else holds them; the MCP client's result cache may still do so.
+        """
+        if self.raw:
+            # Encode now, while the bytes are still here
+            self._b64 = self.b64
+            self.raw = b""
+
+
+def _encode_images(value: Any) -> Any:
+    """Replace ImagePayloads in nested result dicts with their base64 strings"""
+    if isinstance(value, ImagePayload):
+        return value.b64
+    if isinstance(value, dict):
+        return {k: _encode_images(v) for k, v in value.items()}
+    return value
+
+
+# Named per-card outputs, in the order they appear in serialized results
+CARD_RESULT_FIELDS = (
+    "orientation_corrected",
+    "background_removed",
+    "identification",
+    "grade",
+    "enhanced",
+    "listing_description",
+)
+
+
+@dataclass(slots=True)
+class CardResult:
+    """Result of processing a single card image (front or back)
+    
+    Each step output has its own slot; None means the step produced nothing.
+    """
+    steps_completed: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    orientation_corrected: Optional[ImagePayload] = None
+    background_removed: Optional[ImagePayload] = None
+    identification: Optional[Dict[str, Any]] = None
+    grade: Optional[Dict[str, Any]] = None
+    enhanced: Optional[ImagePayload] = None
+    listing_description: Optional[Dict[str, Any]] = None
+    
+    def release_images(self):
+        """Drop references to decoded intermediate images once the card is finished"""
+        for image in (self.orientation_corrected, self.background_removed, self.enhanced):
+            if image is not None:
+                image.release()
+    
+    def results_dict(self) -> Dict[str, Any]:
+        """Step outputs as the results dict used in API responses (unset outputs omitted)"""
+        results = {}
+        for name in CARD_RESULT_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                results[name] = value
+        return results
+
+
+@dataclass(slots=True)
+class PairResult:
+    """Result of processing a card pair (or a single card when pair_index is None)"""
+    card_index: int
+    pair_index: Optional[int] = None
+    steps_completed: List[str] = field(default_factory=list)
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    agent_thoughts: List[Any] = field(default_factory=list)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to the JSON shape returned by the API"""
+        results, self.results = self.results, {}
+        try:
+            data = asdict(self)
+        finally:
+            self.results = results
+        data["results"] = _encode_images(results)
+        if self.pair_index is None:
+            del data["pair_index"]
+        return data
@@ -2,385 +2,443 @@
 Step processors for individual card processing steps
 """
 import asyncio
-import base64
+import logging
 from typing import Any, Dict, List, Optional, Tuple
+from .results import CardResult, ImagePayload
+
+logger = logging.getLogger(__name__)
+
+# process_card_batch op -> label used when that op fails (matches the individual steps)
+CARD_BATCH_ERROR_LABELS = {
+    "identify": "Identification failed",
+    "grade": "Grading failed",
+    "enhance": "Enhancement failed"
+}
+
+
+async def _grading_progress_thoughts(thought_logger, prefix: str, card_type: str, done: asyncio.Event):
+    """Add intermediate thoughts during grading, returning as soon as done is set"""
+    progress = (
+        (3, f"{prefix}Still examining the {card_type}... This takes a moment to be thorough! I want to check every corner and edge carefully."),
+        (5, f"{prefix}Looking at the {card_type}... Almost done with the condition assessment! Just checking all the fine details now!")
+    )
+    for delay, thought in progress:
+        try:
+            await asyncio.wait_for(done.wait(), timeout=delay)
+            return
+        except asyncio.TimeoutError:
+            pass
+        if thought_logger.session_id:
+            thought_logger.log_thought(thought, "step")
 
 
 class StepProcessor:
     """Handles processing of individual steps for card images"""
     
+    # Created per card side, so skip the per-instance __dict__
+    __slots__ = ("mcp_client", "thought_logger", "pair_index", "card_type", "prefix")
+    
     def __init__(self, mcp_client, thought_logger, pair_index: int, card_type: str):
         self.mcp_client = mcp_client
         self.thought_logger = thought_logger
         self.pair_index = pair_index
         self.card_type = card_type
+        # Every thought from this processor starts with the same prefix, so build it once
+        self.prefix = f"Card pair {pair_index+1} ({card_type}): "
+    
+    async def _call(
+        self, 
+        tool: str, 
+        params: Dict[str, Any], 
+        card_result: CardResult, 
+        error_label: str, 
+        timeout: Optional[float] = None,
+        show_error: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Call an MCP tool, returning its result on success
+        
+        On failure the error is recorded on the card and logged, and None is returned.
+        """
+        call = self.mcp_client.call_tool(tool, params)
+        result = await (asyncio.wait_for(call, timeout=timeout) if timeout else call)
+        return self._check(result, card_result, error_label, show_error)
+    
+    def _check(
+        self, 
+        result: Dict[str, Any], 
+        card_result: CardResult, 
+        error_label: str, 
+        show_error: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Return a tool result if it succeeded, otherwise record and log the error and return None
+        
+        show_error puts the tool's error message in the thought too, not just on the card.
+        """
+        if result.get("success"):
+            return result
+        error_msg = result.get("error", "Unknown error")
+        card_result.errors.append(f"{error_label}: {error_msg}")
+        thought = f"{error_label}: {error_msg}" if show_error else error_label
+        self.thought_logger.log_thought(f"{self.prefix}{thought}", "error")
+        return None
+    
+    def _succeed(self, card_result: CardResult, completed: str, message: str, metadata: Dict[str, Any] = None):
+        """Mark a step completed and log its success thought"""
+        card_result.steps_completed.append(completed)
+        self.thought_logger.log_thought(f"{self.prefix}{message}", "success", metadata)
+    
+    def _image_update(self, image_type: str, image: ImagePayload, step: str) -> Dict[str, Any]:
+        """Metadata for a real-time preview of an updated image"""
+        return {
+            "image_update": {
+                "pair_index": self.pair_index,
+                "card_type": self.card_type,
+                "image_type": image_type,
+                "image_base64": image.b64,
+                "step": step
+            }
+        }
     
     async def process_orientation(
         self, 
         current_image: bytes, 
-        card_result: Dict[str, Any]
+        card_result: CardResult
     ) -> Tuple[bytes, bool]:
         """Process orientation check and rotation"""
         self.thought_logger.log_thought(
-            f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the {self.card_type} of this card... First, let me check if it's properly oriented!", 
+            f"{self.prefix}Looking at the {self.card_type} of this card... First, let me check if it's properly oriented!", 
             "step"
         )
         
-        result = await self.mcp_client.call_tool("check_orientation", {"image_bytes": current_image})
-        if not result.get("success"):
-            card_result["errors"].append(f"Orientation check failed: {result.get('error')}")
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Orientation check failed", 
-                "error"
-            )
+        result = await self._call("check_orientation", {"image_bytes": current_image}, card_result, "Orientation check failed")
+        if result is None:
             return current_image, False
         
-        if result.get("needs_rotation"):
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the {self.card_type}... Hmm, this needs to be rotated! Let me fix that for you!", 
-                "step"
+        if not result.get("needs_rotation"):
+            self._succeed(
+                card_result, 
+                "orientation_verified", 
+                f"Looking at the {self.card_type}... Excellent! It's already in the perfect position for analysis!"
             )
-            
-            try:
-                rotation_result = await asyncio.wait_for(
-                    self.mcp_client.call_tool("rotate_image", {
-                        "image_bytes": current_image,
-                        "angle": result.get("rotation_angle", -90),
-                        "expand": True,
-                        "fillcolor": "white"
-                    }),
-                    timeout=30.0
-                )
-                
-                if rotation_result.get("success"):
-                    rotated_base64_str = rotation_result["rotated_image"]
-                    rotated_image = base64.b64decode(rotated_base64_str)
-                    card_result["results"]["orientation_corrected"] = rotated_base64_str
-                    card_result["steps_completed"].append("orientation_corrected")
-                    self.thought_logger.log_thought(
-                        f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the {self.card_type}... Perfect! It's now properly oriented. Much better for examination!", 
-                        "success"
-                    )
-                    self.thought_logger.log_thought(
-                        f"Card pair {self.pair_index+1} ({self.card_type}): Examining the {self.card_type}... Orientation is perfect - ready to continue!", 
-                        "success",
-                        {
-                            "image_update": {
-                                "pair_index": self.pair_index,
-                                "card_type": self.card_type,
-                                "image_type": "orientation_corrected",
-                                "image_base64": rotated_base64_str,
-                                "step": "orientation"
-                            }
-                        }
-                    )
-                    return rotated_image, True
-                else:
-                    card_result["errors"].append(f"Rotation failed: {rotation_result.get('error')}")
-                    self.thought_logger.log_thought(
-                        f"Card pair {self.pair_index+1} ({self.card_type}): Rotation failed", 
-                        "error"
-                    )
-                    return current_image, False
-                    
-            except asyncio.TimeoutError:
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Rotation timed out - skipping", 
-                    "error"
-                )
-                card_result["errors"].append("Rotation timed out - skipping orientation correction")
-                return current_image, False
-        else:
-            card_result["steps_completed"].append("orientation_verified")
+            return current_image, True
+        
+        self.thought_logger.log_thought(
+            f"{self.prefix}Looking at the {self.card_type}... Hmm, this needs to be rotated! Let me fix that for you!", 
+            "step"
+        )
+        
+        try:
+            rotation_result = await self._call(
+                "rotate_image", 
+                {
+                    "image_bytes": current_image,
+                    "angle": result.get("rotation_angle", -90),
+                    "expand": True,
+                    "fillcolor": "white"
+                }, 
+                card_result, 
+                "Rotation failed", 
+                timeout=30.0
+            )
+        except asyncio.TimeoutError:
             self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the {self.card_type}... Excellent! It's already in the perfect position for analysis!", 
-                "success"
+                f"{self.prefix}Rotation timed out - skipping", 
+                "error"
             )
-            return current_image, True
+            card_result.errors.append("Rotation timed out - skipping orientation correction")
+            return current_image, False
+        
+        if rotation_result is None:
+            return current_image, False
+        
+        rotated: ImagePayload = rotation_result["rotated_image"]
+        card_result.orientation_corrected = rotated
+        self._succeed(
+            card_result, 
+            "orientation_corrected", 
+            f"Looking at the {self.card_type}... Perfect! It's now properly oriented - ready to continue!", 
+            self._image_update("orientation_corrected", rotated, "orientation")
+        )
+        return rotated.raw, True
     
     async def process_background_removal(
         self, 
         current_image: bytes, 
-        card_result: Dict[str, Any]
+        card_result: CardResult
     ) -> Tuple[bytes, bool]:
         """Process background removal"""
         if not current_image:
-            card_result["errors"].append("No image data for background removal")
+            card_result.errors.append("No image data for background removal")
             self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): No image data for background removal", 
+                f"{self.prefix}No image data for background removal", 
                 "error"
             )
             return current_image, False
         
         self.thought_logger.log_thought(
-            f"Card pair {self.pair_index+1} ({self.card_type}): Still examining the {self.card_type}... Now I'll carefully remove the background so I can see your card more clearly!", 
+            f"{self.prefix}Still examining the {self.card_type}... Now I'll carefully remove the background so I can see your card more clearly!", 
             "step"
         )
-        result = await self.mcp_client.call_tool("remove_background", {"image_bytes": current_image})
-        
-        if result.get("success"):
-            bg_removed_base64_str = result["processed_image"]
-            bg_removed_image = base64.b64decode(bg_removed_base64_str)
-            card_result["results"]["background_removed"] = bg_removed_base64_str
-            card_result["steps_completed"].append("background_removed")
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the {self.card_type}... Wonderful! The background has been removed. Much clearer now!", 
-                "success"
-            )
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Examining the {self.card_type}... Much better! Now I can see your card without any distractions!", 
-                "step",
-                {
-                    "image_update": {
-                        "pair_index": self.pair_index,
-                        "card_type": self.card_type,
-                        "image_type": "background_removed",
-                        "image_base64": bg_removed_base64_str,
-                        "step": "background_removal"
-                    }
-                }
-            )
-            return bg_removed_image, True
-        else:
-            card_result["errors"].append(f"Background removal failed: {result.get('error')}")
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Background removal failed", 
-                "error"
-            )
+        result = await self._call("remove_background", {"image_bytes": current_image}, card_result, "Background removal failed")
+        if result is None:
             return current_image, False
+        
+        bg_removed: ImagePayload = result["processed_image"]
+        card_result.background_removed = bg_removed
+        self._succeed(
+            card_result, 
+            "background_removed", 
+            f"Looking at the {self.card_type}... Wonderful! The background has been removed. Now I can see your card without any distractions!", 
+            self._image_update("background_removed", bg_removed, "background_removal")
+        )
+        return bg_removed.raw, True
     
     async def process_identification(
         self, 
         current_image: bytes, 
-        card_result: Dict[str, Any],
+        card_result: CardResult,
         should_identify: bool = True
     ) -> bool:
         """Process card identification"""
         if not should_identify:
             self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the back of this card... All card backs look the same, so I don't need to identify it!", 
+                f"{self.prefix}Looking at the back of this card... All card backs look the same, so I don't need to identify it!", 
                 "step"
             )
             return False
         
-        print(f"🔍 DEBUG: Starting identification for {self.card_type}")
+        logger.debug("Starting identification for %s", self.card_type)
         if not current_image:
-            card_result["errors"].append("No image data for card identification")
+            card_result.errors.append("No image data for card identification")
             self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): No image data for card identification", 
+                f"{self.prefix}No image data for card identification", 
                 "error"
             )
             return False
         
         self.thought_logger.log_thought(
-            f"Card pair {self.pair_index+1} ({self.card_type}): Looking closely at the {self.card_type}... This is fascinating! Let me identify which Pokémon this is!", 
+            f"{self.prefix}Looking closely at the {self.card_type}... This is fascinating! Let me identify which Pokémon this is!", 
             "step"
         )
-        print(f"🔍 DEBUG: About to call identify_card MCP tool for {self.card_type}")
-        result = await self.mcp_client.call_tool("identify_card", {"image_bytes": current_image})
-        print(f"🔍 DEBUG: identify_card result: {result.get('success')}")
-        
-        if result.get("success"):
-            card_result["results"]["identification"] = result["identification"]
-            card_result["steps_completed"].append("identified")
-            card_name = result["identification"].get("best", {}).get("name", "Unknown")
-            confidence = result["identification"].get("confidence", 0.0)
-            print(f"🔍 DEBUG: Card identified as: {card_name} (confidence: {confidence})")
-            
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Aha! I believe this is a {card_name}!", 
-                "success",
-                {"pair_index": self.pair_index, "card_name": card_name}
-            )
-            if confidence > 0:
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): What an interesting find! This {card_name} looks great!", 
-                    "step",
-                    {"pair_index": self.pair_index, "card_name": card_name}
-                )
-            print(f"🔍 DEBUG: Logged identification thoughts for {card_name}")
-            return True
-        else:
-            card_result["errors"].append(f"Identification failed: {result.get('error')}")
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Identification failed", 
-                "error"
-            )
-            print(f"🔍 DEBUG: Identification failed: {result.get('error')}")
+        result = await self._call("identify_card", {"image_bytes": current_image}, card_result, "Identification failed")
+        if result is None:
             return False
+        
+        self._record_identification(result, card_result)
+        return True
+    
+    def _record_identification(self, result: Dict[str, Any], card_result: CardResult):
+        """Store a successful identification and announce the card"""
+        identification = card_result.identification = result["identification"]
+        card_name = identification.get("best", {}).get("name", "Unknown")
+        confidence = identification.get("confidence", 0.0)
+        logger.debug("Card identified as: %s (confidence: %s)", card_name, confidence)
+        
+        message = f"Aha! I believe this is a {card_name}!"
+        if confidence > 0:
+            message += f" What an interesting find! This {card_name} looks great!"
+        self._succeed(card_result, "identified", message, {"pair_index": self.pair_index, "card_name": card_name})
     
     async def process_grading(
         self, 
         original_image: bytes, 
-        card_result: Dict[str, Any]
+        card_result: CardResult
     ) -> bool:
         """Process card grading"""
         if not original_image:
-            card_result["errors"].append("No image data for card grading")
+            card_result.errors.append("No image data for card grading")
             self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): No image data for card grading", 
+                f"{self.prefix}No image data for card grading", 
                 "error"
             )
             return False
         
         self.thought_logger.log_thought(
-            f"Card pair {self.pair_index+1} ({self.card_type}): Examining the {self.card_type} carefully... Now I'll assess the condition - checking corners, edges, and surface quality!", 
+            f"{self.prefix}Examining the {self.card_type} carefully... Now I'll assess the condition - checking corners, edges, and surface quality!", 
             "step"
         )
         self.thought_logger.log_thought(
-            f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the {self.card_type}... Using the original image for grading to ensure I can see all the details clearly!", 
+            f"{self.prefix}Looking at the {self.card_type}... Using the original image for grading to ensure I can see all the details clearly!", 
             "step"
         )
         
-        # Add progress thoughts for grading (especially important for back cards)
-        async def _add_grading_progress_thoughts():
-            await asyncio.sleep(3)
-            if self.thought_logger.session_id:
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Still examining the {self.card_type}... This takes a moment to be thorough! I want to check every corner and edge carefully.", 
-                    "step"
-                )
-            await asyncio.sleep(5)
-            if self.thought_logger.session_id:
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the {self.card_type}... Almost done with the condition assessment! Just checking all the fine details now!", 
-                    "step"
-                )
-        
-        # Start progress thoughts as a background task
-        if self.card_type == "back":
-            asyncio.create_task(_add_grading_progress_thoughts())
-        
-        try:
-            result = await asyncio.wait_for(
-                self.mcp_client.call_tool("grade_card", {"image_bytes": original_image}),
-                timeout=180.0  # 3 minute timeout
-            )
-            
-            if result.get("success"):
-                card_result["results"]["grade"] = result["grade"]
-                card_result["steps_completed"].append("graded")
-                self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Examining the {self.card_type}... Excellent! I've completed my condition assessment of the {self.card_type}!", 
-                    "success"
+        # Progress thoughts while a back card is graded (it tends to take longest); the task
+        # group guarantees they are finished before this method returns
+        done = asyncio.Event()
+        async with asyncio.TaskGroup() as tg:
+            if self.card_type == "back":
+                tg.create_task(_grading_progress_thoughts(self.thought_logger, self.prefix, self.card_type, done))
+            try:
+                result = await self._call(
+                    "grade_card", 
+                    {"image_bytes": original_image}, 
+                    card_result, 
+                    "Grading failed", 
+                    timeout=180.0,  # 3 minute timeout
+                    show_error=True
                 )
+            except asyncio.TimeoutError:
+                card_result.errors.append("Grading failed: Grading timed out after 3 minutes")
                 self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Looking at the {self.card_type}... The condition assessment is complete! This card looks good!", 
-                    "step"
+                    f"{self.prefix}Grading timed out - the analysis is taking too long. This might happen with back cards.", 
+                    "error"
                 )
-                grade_data = result.get("grade", {})
-                if grade_data.get("records") and grade_data["records"][0].get("_full_url_card"):
-                    self.thought_logger.log_thought(
-                        f"Card pair {self.pair_index+1} ({self.card_type}): Examining the {self.card_type}... I've created a detailed grading analysis image showing the condition assessment!", 
-                        "success"
-                    )
-                return True
-            else:
-                error_msg = result.get('error', 'Unknown error')
-                card_result["errors"].append(f"Grading failed: {error_msg}")
+                return False
+            except Exception as e:
+                error_msg = str(e)
+                card_result.errors.append(f"Grading failed: {error_msg}")
                 self.thought_logger.log_thought(
-                    f"Card pair {self.pair_index+1} ({self.card_type}): Grading failed: {error_msg}", 
+                    f"{self.prefix}Grading error: {error_msg}", 
                     "error"
                 )
+                logger.exception("Error grading %s card", self.card_type)
                 return False
-                
-        except asyncio.TimeoutError:
-            error_msg = "Grading timed out after 3 minutes"
-            card_result["errors"].append(f"Grading failed: {error_msg}")
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Grading timed out - the analysis is taking too long. This might happen with back cards.", 
-                "error"
-            )
+            finally:
+                # Don't post "still examining" thoughts once grading has finished
+                done.set()
+        
+        if result is None:
             return False
-        except Exception as e:
-            error_msg = str(e)
-            card_result["errors"].append(f"Grading failed: {error_msg}")
+        
+        self._record_grade(result, card_result)
+        return True
+    
+    def _record_grade(self, result: Dict[str, Any], card_result: CardResult):
+        """Store a successful grade"""
+        grade = card_result.grade = result["grade"]
+        self._succeed(
+            card_result, 
+            "graded", 
+            f"Examining the {self.card_type}... Excellent! I've completed my condition assessment of the {self.card_type} - this card looks good!"
+        )
+        records = (grade or {}).get("records")
+        if records and records[0].get("_full_url_card"):
             self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Grading error: {error_msg}", 
-                "error"
+                f"{self.prefix}Examining the {self.card_type}... I've created a detailed grading analysis image showing the condition assessment!", 
+                "success"
             )
-            print(f"❌ Error grading {self.card_type} card: {error_msg}")
-            import traceback
-            traceback.print_exc()
-            return False
     
     async def process_enhancement(
         self, 
         current_image: bytes, 
-        card_result: Dict[str, Any]
+        card_result: CardResult
     ) -> Tuple[bytes, bool]:
         """Process image enhancement"""
         if self.card_type == "back":
             self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Skipping enhancement for back image", 
+                f"{self.prefix}Skipping enhancement for back image", 
                 "step"
             )
             return current_image, False
         
-        result = await self.mcp_client.call_tool("enhance_image", {"image_bytes": current_image})
-        if result.get("success"):
-            enhanced_base64_str = result["enhanced_image"]
-            enhanced_image = base64.b64decode(enhanced_base64_str)
-            card_result["results"]["enhanced"] = enhanced_base64_str
-            card_result["steps_completed"].append("enhanced")
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Image enhanced successfully", 
-                "success"
-            )
-            return enhanced_image, True
-        else:
-            card_result["errors"].append(f"Enhancement failed: {result.get('error')}")
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Enhancement failed", 
-                "error"
-            )
+        result = await self._call("enhance_image", {"image_bytes": current_image}, card_result, "Enhancement failed")
+        if result is None:
             return current_image, False
+        
+        return self._record_enhancement(result, card_result), True
+    
+    def _record_enhancement(self, result: Dict[str, Any], card_result: CardResult) -> bytes:
+        """Store a successful enhancement and return the enhanced image"""
+        enhanced: ImagePayload = result["enhanced_image"]
+        card_result.enhanced = enhanced
+        self._succeed(card_result, "enhanced", "Image enhanced successfully")
+        return enhanced.raw
+    
+    async def process_card_batch(
+        self, 
+        current_image: bytes, 
+        original_image: bytes, 
+        card_result: CardResult,
+        ops: List[str]
+    ) -> bytes:
+        """Run identify / grade / enhance ops in one fused tool call
+        
+        The image is uploaded once (plus the original for grading) and each op's result
+        is recorded exactly as its individual step would. Returns the current image,
+        enhanced if enhancement succeeded.
+        """
+        params = {"image_bytes": current_image, "ops": ops}
+        if original_image is not current_image:
+            params["original_bytes"] = original_image
+        
+        done = asyncio.Event()
+        async with asyncio.TaskGroup() as tg:
+            if "grade" in ops and self.card_type == "back":
+                tg.create_task(_grading_progress_thoughts(self.thought_logger, self.prefix, self.card_type, done))
+            try:
+                result = await self._call(
+                    "process_card_batch", 
+                    params, 
+                    card_result, 
+                    "Card batch processing failed", 
+                    timeout=180.0  # bounded by grading, the slowest op
+                )
+            except asyncio.TimeoutError:
+                card_result.errors.append("Card batch processing timed out after 3 minutes")
+                self.thought_logger.log_thought(
+                    f"{self.prefix}Examining the {self.card_type} is taking too long - skipping the remaining checks", 
+                    "error"
+                )
+                return current_image
+            finally:
+                done.set()
+        
+        if result is None:
+            return current_image
+        
+        op_results = result["results"]
+        for op in ops:
+            op_result = self._check(op_results.get(op, {}), card_result, CARD_BATCH_ERROR_LABELS[op], show_error=op == "grade")
+            if op_result is None:
+                continue
+            if op == "identify":
+                self._record_identification(op_result, card_result)
+            elif op == "grade":
+                self._record_grade(op_result, card_result)
+            else:
+                current_image = self._record_enhancement(op_result, card_result)
+        return current_image
     
     async def process_description(
         self, 
-        card_result: Dict[str, Any]
+        card_result: CardResult
     ) -> bool:
         """Process description generation"""
         if self.card_type != "front":
             self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Skipping description generation - will use front side data", 
+                f"{self.prefix}Skipping description generation - will use front side data", 
                 "step"
             )
             return False
         
-        id_data = card_result["results"].get("identification", {})
-        grade_data = card_result["results"].get("grade", {})
-        confidence = id_data.get("confidence", 0.0)
-        needs_review = id_data.get("needsManualReview", True)
+        id_data = card_result.identification or {}
+        grade_data = card_result.grade or {}
+        if not id_data and not grade_data:
+            # Nothing to describe - don't spend a tool round trip on an empty listing
+            self.thought_logger.log_thought(
+                f"{self.prefix}No identification or grade data to describe - skipping description generation", 
+                "step"
+            )
+            return False
         
         self.thought_logger.log_thought(
-            f"Card pair {self.pair_index+1} ({self.card_type}): Perfect! Now I'll write a detailed listing description for you!", 
+            f"{self.prefix}Perfect! Now I'll write a detailed listing description for you!", 
             "step"
         )
-        result = await self.mcp_client.call_tool("generate_description", {
-            "id_result": id_data,
-            "grade_result": grade_data,
-            "confidence": confidence,
-            "needs_review": needs_review
-        })
-        
-        if result.get("success"):
-            card_result["results"]["listing_description"] = result["description"]
-            card_result["steps_completed"].append("description_generated")
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Description generated successfully", 
-                "success"
-            )
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Excellent! Your listing description is ready!", 
-                "step"
-            )
-            return True
-        else:
-            card_result["errors"].append(f"Description generation failed: {result.get('error')}")
-            self.thought_logger.log_thought(
-                f"Card pair {self.pair_index+1} ({self.card_type}): Description generation failed", 
-                "error"
-            )
+        result = await self._call(
+            "generate_description", 
+            {
+                "id_result": id_data,
+                "grade_result": grade_data,
+                "confidence": id_data.get("confidence", 0.0),
+                "needs_review": id_data.get("needsManualReview", True)
+            }, 
+            card_result, 
+            "Description generation failed"
+        )
+        if result is None:
             return False
-
+        
+        card_result.listing_description = result["description"]
+        self._succeed(card_result, "description_generated", "Description generated successfully - your listing description is ready!")
+        return True
@@ -2,29 +2,229 @@
 Thought logging and transformation for AI Agent
 Handles Professor Oak-style message transformation
 """
+import asyncio
+import logging
+import re
+import sys
+import threading
 import time
-from typing import Any, Dict, List
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+import orjson
 
-# Global store for real-time thoughts
-_realtime_thoughts: Dict[str, List[Dict[str, Any]]] = {}
+from core.settings import settings
 
-def get_realtime_thoughts(session_id: str) -> List[Dict[str, Any]]:
-    """Get real-time thoughts for a session"""
-    return _realtime_thoughts.get(session_id, [])
+logger = logging.getLogger(__name__)
 
-def clear_realtime_thoughts(session_id: str):
+# Friendly thoughts that announce an identified card
+_IDENT_RE = re.compile(r"I believe this is a|What an interesting find")
+# "Identified as <name> (<confidence>% ..."
+_IDENTIFIED_RE = re.compile(r"Identified as (.+?) \((\d+(?:\.\d+)?)%")
+
+# A friendly-message rule handler: returns the response, or None to pass to the next rule
+FriendlyHandler = Callable[[str], Optional[str]]
+
+# Stand-in for missing metadata; never mutated
+_EMPTY: Dict[str, Any] = {}
+
+
+class _SessionThoughts:
+    """Bounded ring buffer of a session's thoughts plus a count of all thoughts ever added
+    
+    Each thought is kept only as its JSON, serialized once, so any number of stream listeners
+    can send the same bytes; image_update thoughts carry multi-MB previews, which a second
+    (dict) copy would double. The dict getters decode on demand.
+    """
+    __slots__ = ("encoded", "total", "touched")
+    
+    def __init__(self) -> None:
+        self.encoded: Deque[bytes] = deque(maxlen=settings.realtime_thought_cap)
+        self.total = 0
+        self.touched = time.monotonic()  # When thoughts were last added
+    
+    def since(self, seen: int) -> Sequence[bytes]:
+        """The thoughts added after the first `seen` that are still buffered"""
+        new_count = min(self.total - seen, len(self.encoded))
+        return tuple(self.encoded)[-new_count:] if new_count > 0 else ()
+
+
+def _decode(encoded: Sequence[bytes]) -> Sequence[Dict[str, Any]]:
+    return tuple(orjson.loads(entry) for entry in encoded)
+
+
+# Global store for real-time thoughts; readers use .get() so only writers create sessions
+_realtime_thoughts: "defaultdict[str, _SessionThoughts]" = defaultdict(_SessionThoughts)
+
+# Striped locks so sessions on different stripes never contend (safe with worker threads too)
+_LOCK_STRIPES = 32
+_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+def _lock_for(session_id: str) -> threading.Lock:
+    return _locks[hash(session_id) % _LOCK_STRIPES]
+
+# Real-time thoughts are buffered per logger and published in batches of up to this many,
+# or after this many seconds, whichever comes first
+REALTIME_FLUSH_SIZE = 16
+REALTIME_FLUSH_INTERVAL = 0.1
+
+# Stream listeners waiting for a session's next thoughts, each a future on its listener's event loop.
+# Kept apart from _realtime_thoughts so a listener can wait before the session's first thought.
+_thought_waiters: Dict[str, List[asyncio.Future]] = {}
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+def _store_realtime_thoughts(session_id: str, thought_entries: List[Dict[str, Any]]) -> None:
+    """Append thoughts to a session's real-time queue under a single lock acquisition"""
+    encoded = [orjson.dumps(entry) for entry in thought_entries]  # Serialized once, outside the lock
+    with _lock_for(session_id):
+        session = _realtime_thoughts[session_id]
+        session.encoded.extend(encoded)
+        session.total += len(thought_entries)
+        session.touched = time.monotonic()
+        waiters = _thought_waiters.pop(session_id, None)
+    # Publishing may happen off the listeners' loop (worker threads)
+    for future in waiters or ():
+        future.get_loop().call_soon_threadsafe(_wake, future)
+
+async def wait_for_realtime_thoughts(session_id: str, seen: int, timeout: float) -> bool:
+    """Wait up to `timeout` seconds for a session to have more than `seen` thoughts; True if it does"""
+    future = asyncio.get_running_loop().create_future()
+    with _lock_for(session_id):
+        session = _realtime_thoughts.get(session_id)
+        if session is not None and session.total > seen:
+            return True
+        _thought_waiters.setdefault(session_id, []).append(future)
+    try:
+        await asyncio.wait_for(future, timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        with _lock_for(session_id):
+            waiters = _thought_waiters.get(session_id)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del _thought_waiters[session_id]
+
+def get_realtime_thoughts(session_id: str) -> Sequence[Dict[str, Any]]:
+    """Get an immutable snapshot of the (most recent) real-time thoughts for a session"""
+    with _lock_for(session_id):
+        session = _realtime_thoughts.get(session_id)
+        encoded = tuple(session.encoded) if session else ()
+    return _decode(encoded)
+
+def get_realtime_thoughts_json(session_id: str) -> bytes:
+    """Get the (most recent) real-time thoughts for a session as newline-separated JSON"""
+    with _lock_for(session_id):
+        session = _realtime_thoughts.get(session_id)
+        return b"\n".join(session.encoded) if session else b""
+
+def drain_realtime_thoughts(session_id: str) -> Sequence[Dict[str, Any]]:
+    """Take all buffered real-time thoughts for a session, leaving its buffer empty"""
+    with _lock_for(session_id):
+        session = _realtime_thoughts.get(session_id)
+        if session is None or not session.encoded:
+            return ()
+        drained = session.encoded
+        session.encoded = deque(maxlen=drained.maxlen)
+    return _decode(drained)
+
+def get_realtime_thoughts_since(session_id: str, seen: int) -> Tuple[Sequence[Dict[str, Any]], int]:
+    """Get thoughts added after the first `seen`, and the new total to pass next time
+    
+    Thoughts that fell out of the ring buffer before being read are skipped.
+    """
+    with _lock_for(session_id):
+        session = _realtime_thoughts.get(session_id)
+        if session is None or session.total <= seen:
+            return (), seen
+        new_thoughts, total = session.since(seen), session.total
+    return _decode(new_thoughts), total
+
+def get_realtime_thoughts_json_since(session_id: str, seen: int) -> Tuple[Sequence[bytes], int]:
+    """Like get_realtime_thoughts_since, but each thought as its pre-serialized JSON bytes"""
+    with _lock_for(session_id):
+        session = _realtime_thoughts.get(session_id)
+        if session is None or session.total <= seen:
+            return (), seen
+        return session.since(seen), session.total
+
+def clear_realtime_thoughts(session_id: str) -> None:
     """Clear real-time thoughts for a session"""
-    if session_id in _realtime_thoughts:
-        del _realtime_thoughts[session_id]
+    with _lock_for(session_id):
+        _realtime_thoughts.pop(session_id, None)
+
+def evict_stale_realtime_thoughts(max_age: float) -> int:
+    """Drop sessions that have had no new thoughts for max_age seconds; returns how many"""
+    cutoff = time.monotonic() - max_age
+    evicted = 0
+    for session_id in list(_realtime_thoughts):
+        with _lock_for(session_id):
+            session = _realtime_thoughts.get(session_id)
+            if session is not None and session.touched < cutoff:
+                del _realtime_thoughts[session_id]
+                evicted += 1
+    return evicted
+
+async def evict_stale_realtime_thoughts_forever(interval: float = 60.0):
+    """Background task: periodically drop real-time thoughts of abandoned sessions"""
+    while True:
+        await asyncio.sleep(interval)
+        evicted = evict_stale_realtime_thoughts(settings.realtime_thought_ttl)
+        if evicted:
+            logger.info("Evicted real-time thoughts of %d idle session(s)", evicted)
 
 class ThoughtLogger:
     """Handles logging and transformation of AI agent thoughts"""
     
-    def __init__(self, session_id: str = None):
+    def __init__(self, session_id: Optional[str] = None, keep_local: bool = False) -> None:
         self.session_id = session_id
-        self.thought_log = []
+        # Local copy of every thought, only kept (and allocated) when asked for - the real-time
+        # store is the main consumer. Bounded so very large batches can't grow it without limit.
+        self._keep_local = keep_local
+        self.thought_log: Optional[Deque[Dict[str, Any]]] = None
+        # Real-time thoughts not yet published to _realtime_thoughts
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+    
+    def get_log(self) -> List[Dict[str, Any]]:
+        """Get the locally kept thoughts (empty unless keep_local is set)"""
+        return list(self.thought_log) if self.thought_log else []
+    
+    def clear_log(self) -> None:
+        """Forget the locally kept thoughts"""
+        if self.thought_log is not None:
+            self.thought_log.clear()
     
-    def log_thought(self, thought: str, step: str = "processing", metadata: Dict[str, Any] = None):
+    def flush(self) -> None:
+        """Publish buffered real-time thoughts for the current session"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            pending, self._pending = self._pending, []
+            if self.session_id:
+                _store_realtime_thoughts(self.session_id, pending)
+    
+    def _publish(self, thought_entry: Dict[str, Any]) -> None:
+        """Buffer a real-time thought, flushing on size or after a short delay"""
+        self._pending.append(thought_entry)
+        if len(self._pending) >= REALTIME_FLUSH_SIZE:
+            self.flush()
+        elif self._flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # No event loop to schedule the delayed flush on - publish right away
+                self.flush()
+                return
+            self._flush_handle = loop.call_later(REALTIME_FLUSH_INTERVAL, self.flush)
+    
+    def log_thought(self, thought: str, step: str = "processing", metadata: Optional[Dict[str, Any]] = None) -> None:
         """Log agent's thought process with user-friendly language
         
         Args:
@@ -36,213 +236,312 @@ class ThoughtLogger:
                 - card_name: the identified card name
         """
         # Convert technical language to user-friendly messages
-        friendly_thought = self._make_thought_friendly(thought, step)
+        self._record(self._make_thought_friendly(thought, step), step, metadata)
+    
+    def log_event(self, kind: str, step: str = "processing", metadata: Optional[Dict[str, Any]] = None, **payload: Any) -> None:
+        """Log a structured event, formatted straight from its template (no text matching)
         
+        Args:
+            kind: A key of _EVENT_FORMATTERS, e.g. "tool_call"
+            step: The processing step type
+            metadata: As for log_thought
+            payload: The fields the event's template needs
+        """
+        self._record(_EVENT_FORMATTERS[kind](payload), step, metadata)
+    
+    def _record(self, friendly_thought: str, step: str, metadata: Optional[Dict[str, Any]]) -> None:
+        """Store a friendly thought locally and for real-time readers"""
+        # Steps come from a small fixed vocabulary; share one string object per step name
+        step = sys.intern(step)
+        
+        # Entries are deliberately not pooled: each dict is shared by thought_log (returned in the
+        # batch results) and the real-time buffer (read by pollers and SSE), so no single owner ever
+        # knows it is safe to recycle. CPython's own dict free list already absorbs the churn.
         thought_entry = {
             "step": step,
             "thought": friendly_thought,
-            "timestamp": time.time() * 1000  # Unix timestamp in milliseconds
+            # Wall-clock Unix milliseconds (int, no float rounding). Not monotonic on purpose: the
+            # web app renders it with new Date(timestamp) and ages it against Date.now().
+            "timestamp": time.time_ns() // 1_000_000
         }
         
-        # Add metadata if provided
-        if metadata:
+        # Add metadata if provided (each key looked up once)
+        meta = metadata or _EMPTY
+        image_update = meta.get("image_update")
+        if image_update is not None:
             # Handle image_update for backward compatibility
-            if "image_update" in metadata:
-                thought_entry["image_update"] = metadata["image_update"]
-                print(f"📸 Image update included: pair_index={metadata['image_update'].get('pair_index')}, card_type={metadata['image_update'].get('card_type')}, image_type={metadata['image_update'].get('image_type')}")
-            elif metadata.get("pair_index") is not None or metadata.get("card_name"):
+            thought_entry["image_update"] = image_update
+            logger.debug(
+                "Image update included: pair_index=%s, card_type=%s, image_type=%s",
+                image_update.get("pair_index"), image_update.get("card_type"), image_update.get("image_type")
+            )
+        else:
+            pair_index = meta.get("pair_index")
+            card_name = meta.get("card_name")
+            if pair_index is not None or card_name:
                 # This is identification metadata - include it directly in the thought entry
-                if "pair_index" in metadata:
-                    thought_entry["pair_index"] = metadata["pair_index"]
-                if "card_name" in metadata:
-                    thought_entry["card_name"] = metadata["card_name"]
-                print(f"🔍 Including identification metadata: pair_index={metadata.get('pair_index')}, card_name={metadata.get('card_name')}")
-        
-        # Check if this is an identification message (contains card name)
-        if "I believe this is a" in friendly_thought or "What an interesting find" in friendly_thought:
-            print(f"🔍 IDENTIFICATION MESSAGE DETECTED: {friendly_thought}")
+                if pair_index is not None:
+                    thought_entry["pair_index"] = pair_index
+                if card_name is not None:
+                    thought_entry["card_name"] = card_name
+                logger.debug("Including identification metadata: pair_index=%s, card_name=%s", pair_index, card_name)
         
-        self.thought_log.append(thought_entry)
-        print(f"🤖 AI Agent ({step}): {friendly_thought}")
+        if self._keep_local:
+            if self.thought_log is None:
+                self.thought_log = deque(maxlen=settings.max_thoughts)
+            self.thought_log.append(thought_entry)
         
         # Store in global real-time thoughts if we have a session_id
         if self.session_id:
-            if self.session_id not in _realtime_thoughts:
-                _realtime_thoughts[self.session_id] = []
-            _realtime_thoughts[self.session_id].append(thought_entry)
-            print(f"📡 Stored thought for session {self.session_id}: {friendly_thought}")
-            if metadata and "image_update" in metadata:
-                print(f"📸 Stored image_update in real-time thoughts for session {self.session_id}")
-            # Extra logging for identification messages
-            if "I believe this is a" in friendly_thought or "What an interesting find" in friendly_thought:
-                print(f"🔍 IDENTIFICATION MESSAGE STORED IN REAL-TIME QUEUE for session {self.session_id} with metadata: {metadata}")
-        else:
-            print(f"⚠️ No session_id available for thought: {friendly_thought}")
+            self._publish(thought_entry)
+        
+        # One log record per thought (the listener thread writes each record separately)
+        if logger.isEnabledFor(logging.DEBUG):
+            if _IDENT_RE.search(friendly_thought):
+                logger.debug("AI Agent (%s) [session %s]: %s | identification metadata: %s", step, self.session_id, friendly_thought, metadata)
+            else:
+                logger.debug("AI Agent (%s) [session %s]: %s", step, self.session_id, friendly_thought)
     
     def _make_thought_friendly(self, thought: str, step: str) -> str:
         """Convert technical AI thoughts to Professor Oak-style language"""
-        
-        # Professor Oak greetings and planning
-        if "Starting batch processing" in thought:
-            # Check if it's pairs or individual cards
-            if "pair" in thought.lower():
-                pair_count = thought.split('of ')[1].split(' card pair')[0] if 'of ' in thought else "your"
-                return f"Hello there! I'm Professor Oak, and I'm excited to examine {pair_count} card pair(s) (front and back) you've brought me!"
-            else:
-                card_count = thought.split('of ')[1].split(' cards')[0] if 'of ' in thought else "your"
-                return f"Hello there! I'm Professor Oak, and I'm excited to examine {card_count} card(s) you've brought me!"
-        
-        elif "AI created processing plan" in thought:
-            return "Excellent! Let me study these cards and create a research plan..."
-        
-        elif "Processing plan:" in thought:
-            return "Ah yes! Here's what I'll do: First, I'll check the orientation, then remove the background to better examine the card. Next, I'll identify which Pokémon this is, assess its condition, and create a detailed listing for you!"
-        
-        elif "Processing card" in thought:
-            card_num = thought.split("Processing card")[1].split("/")[0].strip() if "/" in thought else ""
-            if card_num:
-                return f"Now let me examine card {card_num} carefully..."
-            return "Let me examine this card closely..."
-        
-        # Orientation checks
-        elif "check_orientation" in thought and "Check if card needs rotation" in thought:
-            return "First, let me see if your card is properly oriented..."
-        
-        elif "Card needs rotation to portrait" in thought:
-            return "Hmm, this card needs to be rotated. Let me fix that for you!"
-        
-        elif "Calling MCP tool: check_orientation" in thought:
-            return "Checking the orientation of your card..."
-        
-        elif "Calling MCP tool: rotate_image" in thought:
-            return "Rotating your card to the correct position..."
-        
-        elif "Card rotated to portrait successfully" in thought:
-            return "Perfect! Your card is now properly oriented. Much better for examination!"
-        
-        elif "Card is already in correct portrait orientation" in thought:
-            return "Excellent! This card is already in the perfect position for analysis!"
-        
-        elif "Orientation corrected - proceeding with processing" in thought:
-            card_num = thought.split("Card ")[1].split(":")[0] if "Card " in thought else ""
-            if card_num:
-                return f"Card {card_num} is ready! Moving on with my research..."
-            return "Orientation confirmed! Now I can examine your card properly..."
-        
-        # Background removal
-        elif "remove_background" in thought and "Clean up" in thought:
-            return "Now I'll remove the background to get a clearer view of your card..."
-        
-        elif "Calling MCP tool: remove_background" in thought:
-            return "Processing the background removal - this will help me see the card more clearly!"
-        
-        elif "Background removed successfully" in thought:
-            return "Wonderful! The background has been removed. Now I can see your card much more clearly!"
-        
-        # Card identification
-        elif "identify_card" in thought and "Find out" in thought:
-            return "Now for the exciting part - let me identify which Pokémon this is!"
-        
-        elif "Calling MCP tool: identify_card" in thought:
-            return "Searching through my research database to identify this Pokémon..."
-        
-        elif "Identified as" in thought and "confidence" in thought:
-            try:
-                card_name = thought.split("Identified as ")[1].split(" (")[0]
-                confidence = thought.split("(")[1].split("%")[0]
-                confidence_num = float(confidence) if confidence.replace('.', '').isdigit() else 0.0
-                if confidence_num > 0:
-                    if confidence_num >= 80:
-                        return f"Aha! This is a {card_name}! I'm quite confident about this - {confidence}% certain, in fact!"
-                    elif confidence_num >= 50:
-                        return f"I believe this is a {card_name}, though I'm {confidence}% certain. Let me continue analyzing..."
-                    else:
-                        return f"Hmm, this might be a {card_name}, but I'm only {confidence}% certain. This may need closer examination..."
+        return _friendly(thought)
+
+
+@lru_cache(maxsize=1024)
+def _friendly(thought: str) -> str:
+    """Professor Oak version of a thought; memoized since agents repeat the same thoughts a lot"""
+    
+    # Thoughts that open with a trigger phrase go straight to that rule
+    bucket = _PREFIX_TABLE.get(thought.partition(" ")[0])
+    if bucket is not None and thought.startswith(bucket[0]):
+        for trigger, handler in bucket[1]:
+            if thought.startswith(trigger):
+                friendly = handler(thought)
+                if friendly is not None:
+                    return friendly
+                break
+    
+    # Otherwise apply the first rule whose trigger phrase is present and which accepts the thought
+    for trigger, handler in _FRIENDLY_RULES:
+        if trigger in thought:
+            friendly = handler(thought)
+            if friendly is not None:
+                return friendly
+    
+    # Default: make it sound like Professor Oak with front/back context
+    lowered = thought.lower()
+    if "Card" in thought and ("front" in lowered or "back" in lowered):
+        # Check if it mentions front or back
+        if "front" in lowered:
+            side_context = "Looking at the front of this card"
+        elif "back" in lowered:
+            side_context = "Now examining the back of this card"
+        else:
+            side_context = None
+        
+        # Extract the message part after "Card X (front/back):"
+        _, sep, message = thought.partition(":")
+        if sep:
+            message = message.strip()
+            message_lower = message.lower()
+            if side_context:
+                # Add Professor Oak flair with side context
+                if message_lower.startswith(_NEGATIVE_PREFIXES):
+                    return _T_SIDE_ERROR.format_map({"side": side_context, "message": message_lower})
+                elif message_lower.startswith(_POSITIVE_PREFIXES):
+                    return _T_SIDE_SUCCESS.format_map({"side": side_context, "message": message})
                 else:
-                    return f"I believe this is a {card_name}!"
-            except:
-                return "I've identified the card! Let me check my notes..."
-        
-        # Grading
-        elif "grade_card" in thought and "Check" in thought:
-            return "Now I'll assess the condition of this card - checking corners, edges, and surface quality..."
-        
-        elif "Calling MCP tool: grade_card" in thought:
-            return "Examining the card's condition carefully..."
-        
-        elif "Graded successfully" in thought:
-            return "Excellent! I've completed my condition assessment. The corners, edges, and surface have all been examined!"
-        
-        # Description generation
-        elif "generate_description" in thought and "Create" in thought:
-            return "Now I'll create a detailed listing description for your card!"
-        
-        elif "Calling MCP tool: generate_description" in thought:
-            return "Writing up a comprehensive description for your eBay listing..."
-        
-        elif "Description generated successfully" in thought:
-            return "Perfect! I've created a title and description for your eBay listing. It's ready to go!"
-        
-        # Completion
-        elif "Batch processing complete" in thought:
-            return "Wonderful! My research is complete! Your card has been fully processed and is ready for eBay!"
-        
-        elif "success_rate" in thought:
-            return "Excellent! All processing completed successfully. Everything is ready!"
-        
-        # Generic tool calling
-        elif "Calling MCP tool:" in thought:
-            tool_name = thought.split("Calling MCP tool: ")[1] if "Calling MCP tool: " in thought else "processing"
-            return f"Using my research equipment to {tool_name.replace('_', ' ')}..."
-        
-        # Default: make it sound like Professor Oak with front/back context
-        if "Card" in thought and ("front" in thought.lower() or "back" in thought.lower()):
-            # Check if it mentions front or back
-            if "front" in thought.lower():
-                card_side = "front"
-                side_context = "Looking at the front of this card"
-            elif "back" in thought.lower():
-                card_side = "back"
-                side_context = "Now examining the back of this card"
+                    return _T_SIDE_NOTE.format_map({"side": side_context, "message": message})
             else:
-                card_side = None
-                side_context = None
-            
-            # Extract the message part after "Card X (front/back):"
-            parts = thought.split(":", 1)
-            if len(parts) > 1:
-                message = parts[1].strip()
-                if side_context:
-                    # Add Professor Oak flair with side context
-                    if message.lower().startswith(("error", "failed", "no")):
-                        return f"Oh my! {side_context}, {message.lower()}"
-                    elif message.lower().startswith(("success", "completed", "ready")):
-                        return f"Excellent! {side_context}, {message}"
-                    else:
-                        return f"{side_context}... {message}"
+                # No side context, use regular Professor Oak style
+                if message_lower.startswith(_NEGATIVE_PREFIXES):
+                    return _T_ERROR.format_map({"message": message})
+                elif message_lower.startswith(_POSITIVE_PREFIXES):
+                    return _T_SUCCESS.format_map({"message": message})
                 else:
-                    # No side context, use regular Professor Oak style
-                    if message.lower().startswith(("error", "failed", "no")):
-                        return f"Oh my! {message}"
-                    elif message.lower().startswith(("success", "completed", "ready")):
-                        return f"Excellent! {message}"
-                    else:
-                        return f"Let me see... {message}"
-        
-        # Default: make it sound like Professor Oak
-        if "Card" in thought and ":" in thought:
-            # Extract the message part after "Card X:"
-            parts = thought.split(":", 1)
-            if len(parts) > 1:
-                message = parts[1].strip()
-                # Add Professor Oak flair
-                if message.lower().startswith(("error", "failed", "no")):
-                    return f"Oh my! {message}"
-                elif message.lower().startswith(("success", "completed", "ready")):
-                    return f"Excellent! {message}"
-                else:
-                    return f"Let me see... {message}"
-        
-        # Fallback: add Professor Oak style to any remaining messages
-        return f"Let me check... {thought}"
+                    return _T_NOTE.format_map({"message": message})
+    
+    # Default: make it sound like Professor Oak
+    if "Card" in thought and ":" in thought:
+        # Extract the message part after "Card X:"
+        message = thought.partition(":")[2].strip()
+        message_lower = message.lower()
+        # Add Professor Oak flair
+        if message_lower.startswith(_NEGATIVE_PREFIXES):
+            return _T_ERROR.format_map({"message": message})
+        elif message_lower.startswith(_POSITIVE_PREFIXES):
+            return _T_SUCCESS.format_map({"message": message})
+        else:
+            return _T_NOTE.format_map({"message": message})
+    
+    # Fallback: add Professor Oak style to any remaining messages
+    return _T_FALLBACK.format_map({"thought": thought})
+
+
+# ---- Professor Oak rules for _make_thought_friendly ----
+
+# Opening words that mark a card message as a problem or a success
+_NEGATIVE_PREFIXES = ("error", "failed", "no")
+_POSITIVE_PREFIXES = ("success", "completed", "ready")
+
+# Response templates, filled with str.format_map
+_T_BATCH_PAIRS = "Hello there! I'm Professor Oak, and I'm excited to examine {count} card pair(s) (front and back) you've brought me!"
+_T_BATCH_CARDS = "Hello there! I'm Professor Oak, and I'm excited to examine {count} card(s) you've brought me!"
+_T_EXAMINE_CARD = "Now let me examine card {card} carefully..."
+_T_CARD_READY = "Card {card} is ready! Moving on with my research..."
+_T_HIGH_CONF = "Aha! This is a {name}! I'm quite confident about this - {conf}% certain, in fact!"
+_T_MID_CONF = "I believe this is a {name}, though I'm {conf}% certain. Let me continue analyzing..."
+_T_LOW_CONF = "Hmm, this might be a {name}, but I'm only {conf}% certain. This may need closer examination..."
+_T_NO_CONF = "I believe this is a {name}!"
+_T_TOOL = "Using my research equipment to {tool}..."
+_T_SIDE_ERROR = "Oh my! {side}, {message}"
+_T_SIDE_SUCCESS = "Excellent! {side}, {message}"
+_T_SIDE_NOTE = "{side}... {message}"
+_T_ERROR = "Oh my! {message}"
+_T_SUCCESS = "Excellent! {message}"
+_T_NOTE = "Let me see... {message}"
+_T_FALLBACK = "Let me check... {thought}"
+_PLAN_READY = "Ah yes! Here's what I'll do: First, I'll check the orientation, then remove the background to better examine the card. Next, I'll identify which Pokémon this is, assess its condition, and create a detailed listing for you!"
+_BATCH_COMPLETE = "Wonderful! My research is complete! Your card has been fully processed and is ready for eBay!"
+
+def _const(text: str) -> FriendlyHandler:
+    # One shared (interned) string per static response, however many thoughts reuse it
+    text = sys.intern(text)
+    return lambda thought: text
+
+
+def _requires(other: str, text: str) -> FriendlyHandler:
+    """Rule that only applies when a second phrase is present too"""
+    return lambda thought: text if other in thought else None
+
+
+def _friendly_batch_start(thought: str) -> str:
+    # Check if it's pairs or individual cards
+    if "pair" in thought.lower():
+        pair_count = thought.split('of ')[1].split(' card pair')[0] if 'of ' in thought else "your"
+        return _T_BATCH_PAIRS.format_map({"count": pair_count})
+    card_count = thought.split('of ')[1].split(' cards')[0] if 'of ' in thought else "your"
+    return _T_BATCH_CARDS.format_map({"count": card_count})
+
+
+def _friendly_processing_card(thought: str) -> str:
+    card_num = thought.partition("Processing card")[2].partition("/")[0].strip() if "/" in thought else ""
+    if card_num:
+        return _T_EXAMINE_CARD.format_map({"card": card_num})
+    return "Let me examine this card closely..."
+
+
+def _friendly_orientation_corrected(thought: str) -> str:
+    card_num = thought.partition("Card ")[2].partition(":")[0]
+    if card_num:
+        return _T_CARD_READY.format_map({"card": card_num})
+    return "Orientation confirmed! Now I can examine your card properly..."
+
+
+def _friendly_identified(thought: str) -> Optional[str]:
+    if "confidence" not in thought:
+        return None
+    match = _IDENTIFIED_RE.search(thought)
+    if not match:
+        return "I've identified the card! Let me check my notes..."
+    card_name, confidence = match.group(1, 2)
+    confidence_num = float(confidence)
+    if confidence_num > 0:
+        if confidence_num >= 80:
+            return _T_HIGH_CONF.format_map({"name": card_name, "conf": confidence})
+        elif confidence_num >= 50:
+            return _T_MID_CONF.format_map({"name": card_name, "conf": confidence})
+        else:
+            return _T_LOW_CONF.format_map({"name": card_name, "conf": confidence})
+    else:
+        return _T_NO_CONF.format_map({"name": card_name})
+
+
+def _friendly_tool_call(thought: str) -> str:
+    tool_name = thought.split("Calling MCP tool: ")[1] if "Calling MCP tool: " in thought else "processing"
+    return _T_TOOL.format_map({"tool": tool_name.replace('_', ' ')})
+
+
+# (trigger phrase, handler) in priority order; a handler returning None passes to the next rule
+_FRIENDLY_RULES: Tuple[Tuple[str, FriendlyHandler], ...] = (
+    # Professor Oak greetings and planning
+    ("Starting batch processing", _friendly_batch_start),
+    ("AI created processing plan", _const("Excellent! Let me study these cards and create a research plan...")),
+    ("Processing plan:", _const(_PLAN_READY)),
+    ("Processing card", _friendly_processing_card),
+    # Orientation checks
+    ("check_orientation", _requires("Check if card needs rotation", "First, let me see if your card is properly oriented...")),
+    ("Card needs rotation to portrait", _const("Hmm, this card needs to be rotated. Let me fix that for you!")),
+    ("Calling MCP tool: check_orientation", _const("Checking the orientation of your card...")),
+    ("Calling MCP tool: rotate_image", _const("Rotating your card to the correct position...")),
+    ("Card rotated to portrait successfully", _const("Perfect! Your card is now properly oriented. Much better for examination!")),
+    ("Card is already in correct portrait orientation", _const("Excellent! This card is already in the perfect position for analysis!")),
+    ("Orientation corrected - proceeding with processing", _friendly_orientation_corrected),
+    # Background removal
+    ("remove_background", _requires("Clean up", "Now I'll remove the background to get a clearer view of your card...")),
+    ("Calling MCP tool: remove_background", _const("Processing the background removal - this will help me see the card more clearly!")),
+    ("Background removed successfully", _const("Wonderful! The background has been removed. Now I can see your card much more clearly!")),
+    # Card identification
+    ("identify_card", _requires("Find out", "Now for the exciting part - let me identify which Pokémon this is!")),
+    ("Calling MCP tool: identify_card", _const("Searching through my research database to identify this Pokémon...")),
+    ("Identified as", _friendly_identified),
+    # Grading
+    ("grade_card", _requires("Check", "Now I'll assess the condition of this card - checking corners, edges, and surface quality...")),
+    ("Calling MCP tool: grade_card", _const("Examining the card's condition carefully...")),
+    ("Graded successfully", _const("Excellent! I've completed my condition assessment. The corners, edges, and surface have all been examined!")),
+    # Description generation
+    ("generate_description", _requires("Create", "Now I'll create a detailed listing description for your card!")),
+    ("Calling MCP tool: generate_description", _const("Writing up a comprehensive description for your eBay listing...")),
+    ("Description generated successfully", _const("Perfect! I've created a title and description for your eBay listing. It's ready to go!")),
+    # Completion
+    ("Batch processing complete", _const(_BATCH_COMPLETE)),
+    ("success_rate", _const("Excellent! All processing completed successfully. Everything is ready!")),
+    # Generic tool calling
+    ("Calling MCP tool:", _friendly_tool_call),
+)
+
+
+def _build_prefix_table() -> Dict[str, Tuple[Tuple[str, ...], Tuple[Tuple[str, FriendlyHandler], ...]]]:
+    """Bucket the rules by the first word of their trigger, keeping priority order"""
+    table: Dict[str, List[Tuple[str, FriendlyHandler]]] = {}
+    for trigger, handler in _FRIENDLY_RULES:
+        # Per-card thoughts open with "Card N" / "Card pair N", never with a "Card ..." trigger
+        if trigger.startswith("Card "):
+            continue
+        table.setdefault(trigger.partition(" ")[0], []).append((trigger, handler))
+    # (all triggers in the bucket, for one startswith check; the rules themselves)
+    return {word: (tuple(trigger for trigger, _ in rules), tuple(rules)) for word, rules in table.items()}
+
+
+_PREFIX_TABLE = _build_prefix_table()
+
+
+# ---- Structured events for ThoughtLogger.log_event ----
+
+_TOOL_CALL_PREFIX = "Calling MCP tool: "
+
+# Tools announced in their own words; the rest get _T_TOOL
+_TOOL_CALL_MESSAGES = {
+    trigger[len(_TOOL_CALL_PREFIX):]: handler(trigger)
+    for trigger, handler in _FRIENDLY_RULES
+    if trigger.startswith(_TOOL_CALL_PREFIX) and trigger != _TOOL_CALL_PREFIX.rstrip()
+}
+
+
+def _event_batch_start(payload: Dict[str, Any]) -> str:
+    return (_T_BATCH_PAIRS if payload.get("pairs") else _T_BATCH_CARDS).format_map(payload)
+
+
+def _event_tool_call(payload: Dict[str, Any]) -> str:
+    tool = payload["tool"]
+    return _TOOL_CALL_MESSAGES.get(tool) or _T_TOOL.format_map({"tool": tool.replace('_', ' ')})
+
 
+# Event kind -> formatter of its payload
+_EVENT_FORMATTERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "batch_start": _event_batch_start,            # count, pairs
+    "plan_ready": lambda payload: _PLAN_READY,
+    "processing_card": _T_EXAMINE_CARD.format_map,  # card
+    "tool_call": _event_tool_call,                # tool
+    "batch_complete": lambda payload: _BATCH_COMPLETE,
+}
@@ -0,0 +1,31 @@
+"""Add card_pairs status indexes
+
+Revision ID: 3f9c2d7a1b64
+Revises: 8eaa6cb96db2
+Create Date: 2026-10-15 11:32:08.417215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2d7a1b64'
+down_revision: Union[str, None] = '8eaa6cb96db2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_card_pairs_status_created_at', 'card_pairs', ['status', 'created_at'], unique=False)
+    op.create_index(
+        'ix_card_pairs_needs_manual_created_at', 'card_pairs', ['created_at'], unique=False,
+        postgresql_where=sa.text("status = 'needs_manual'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_card_pairs_needs_manual_created_at', table_name='card_pairs', postgresql_where=sa.text("status = 'needs_manual'"))
+    op.drop_index('ix_card_pairs_status_created_at', table_name='card_pairs')
@@ -1,37 +1,70 @@
-import os
-from pydantic import BaseModel
+from functools import lru_cache
+from pathlib import Path
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+class Settings(BaseSettings):
+    # Values come from the environment, then the repo root's .env (found from this file, so any
+    # working directory works), then the defaults below
+    model_config = SettingsConfigDict(env_file=Path(__file__).resolve().parents[3] / ".env", extra="ignore")
+
+    log_level: str = "INFO"
+    agent_log_level: str = "INFO"
 
-class Settings(BaseModel):
     # Postgres (not used yet in Sprint 1, but keep for consistency)
-    postgres_user: str = os.getenv("POSTGRES_USER", "postgres")
-    postgres_password: str = os.getenv("POSTGRES_PASSWORD", "password")
-    postgres_db: str = os.getenv("POSTGRES_DB", "tcg_pipeline")
-    postgres_host: str = os.getenv("POSTGRES_HOST", "db")
-    postgres_port: int = int(os.getenv("POSTGRES_PORT", "5432"))
+    postgres_user: str = "postgres"
+    postgres_password: str = "password"
+    postgres_db: str = "tcg_pipeline"
+    postgres_host: str = "db"
+    postgres_port: int = 5432
 
     # MinIO
-    minio_endpoint: str = os.getenv("MINIO_ENDPOINT", "minio:9000")
-    minio_bucket: str = os.getenv("MINIO_BUCKET", "cards")
-    minio_access_key: str = os.getenv("MINIO_ROOT_USER", "minioadmin")
-    minio_secret_key: str = os.getenv("MINIO_ROOT_PASSWORD", "minioadmin")
-    minio_use_ssl: bool = os.getenv("MINIO_USE_SSL", "false").lower() == "true"
+    minio_endpoint: str = "minio:9000"
+    minio_bucket: str = "cards"
+    minio_access_key: str = Field("minioadmin", validation_alias="MINIO_ROOT_USER")
+    minio_secret_key: str = Field("minioadmin", validation_alias="MINIO_ROOT_PASSWORD")
+    minio_use_ssl: bool = False
 
     # External APIs (later sprints)
-    ximilar_api_key: str = os.getenv("XIMILAR_API_KEY", "")
-    ximilar_base: str = os.getenv("XIMILAR_BASE", "https://api.ximilar.com")
+    ximilar_api_key: str = ""
+    ximilar_base: str = "https://api.ximilar.com"
 
     # LLM (later)
-    llm_provider: str = os.getenv("LLM_PROVIDER", "stub")
-    llm_api_key: str = os.getenv("LLM_API_KEY", "")
+    llm_provider: str = "stub"
+    llm_api_key: str = ""
 
     # Confidence threshold (used in later sprints)
-    id_confidence_threshold: float = float(os.getenv("ID_CONFIDENCE_THRESHOLD", "0.88"))
+    id_confidence_threshold: float = 0.88
 
     # LLM (OpenAI)
-    openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
-    llm_model: str = os.getenv("LLM_MODEL", "gpt-4o-mini")
+    openai_api_key: str = ""
+    llm_model: str = "gpt-4o-mini"
+    planner_model: str = "gpt-4o-mini"
+    # Ask the LLM for a processing plan instead of using the default plan (per-request: "use_llm_planner" option)
+    use_llm_planner: bool = False
+    openai_timeout: float = 30  # seconds per request
+    openai_max_retries: int = 2
+
+    # AI Agent batch processing
+    max_concurrent_cards: int = 8
+    max_thoughts: int = 5000  # per-batch thought log cap
+    realtime_thought_cap: int = Field(2048, validation_alias="TCG_THOUGHT_CAP")  # per-session real-time thought cap
+    realtime_thought_ttl: int = Field(3600, validation_alias="TCG_THOUGHT_TTL")  # seconds an idle session's thoughts are kept
+    mcp_cache_ttl: int = 3600  # seconds
+    mcp_cache_max_entries: int = 256
+    mcp_cache_max_bytes: int = 64 * 1024 * 1024  # images held by the agent's tool result cache
+    # Uploaded images the MCP server keeps (by sha256) so later tool calls can pass a ref instead
+    mcp_image_store_max_entries: int = 128
+    # Cards the MCP server's batch_process works on at once (bounded to respect the Ximilar quota)
+    mcp_batch_concurrency: int = Field(8, validation_alias="TCG_BATCH_CONCURRENCY")
+    # Send identify/grade/enhance for a card as one process_card_batch call (grading then waits for the image chain)
+    fuse_card_tools: bool = False
+
+    shipping_info: str = "Dispatched within 24 hours via tracked service."
+    returns_policy: str = "30-day returns accepted; buyer pays return postage unless item is not as described."
 
-    shipping_info: str = os.getenv("SHIPPING_INFO", "Dispatched within 24 hours via tracked service.")
-    returns_policy: str = os.getenv("RETURNS_POLICY", "30-day returns accepted; buyer pays return postage unless item is not as described.")
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
 
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
\ No newline at end of file
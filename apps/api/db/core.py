@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from core.settings import settings
 
@@ -7,6 +8,12 @@ DB_URL = (
     f"{settings.postgres_password}@{settings.postgres_host}:"
     f"{settings.postgres_port}/{settings.postgres_db}"
 )
+# Same database through asyncpg, for request handlers (so queries don't block the event loop)
+ASYNC_DB_URL = DB_URL.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
 
+# Sync engine: Alembic migrations and the threadpool /db/ping check
 engine = create_engine(DB_URL, future=True, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
\ No newline at end of file
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+async_engine = create_async_engine(ASYNC_DB_URL, pool_size=20, max_overflow=10, pool_pre_ping=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
\ No newline at end of file
@@ -1,17 +1,14 @@
-from sqlalchemy import select, update
-from db.core import SessionLocal
+from sqlalchemy import update
+from db.core import AsyncSessionLocal
 from models.card_pair import CardPair
 
-def set_status_and_id(pair_id: str, status: str, id_json: dict | None):
-    with SessionLocal() as db:
-        q = select(CardPair).where(CardPair.id == pair_id)
-        row = db.execute(q).scalar_one_or_none()
-        if not row:
-            return False
-        db.execute(
+async def set_status_and_id(pair_id: str, status: str, id_json: dict | None):
+    async with AsyncSessionLocal() as db:
+        # One round trip: the row count says whether the pair exists
+        res = await db.execute(
             update(CardPair)
             .where(CardPair.id == pair_id)
             .values(status=status, id_json=id_json)
         )
-        db.commit()
-        return True
\ No newline at end of file
+        await db.commit()
+        return res.rowcount > 0
\ No newline at end of file
@@ -1,32 +1,87 @@
-import os
-from pathlib import Path
-from dotenv import load_dotenv
+import asyncio
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers
 from routes import debug_storage, db_check, ximilar_debug
 from routes import review as review_routes
 from routes import ai_batch
+from agents import ai_agent
+from agents.ai_agent import close_openai_client
+from agents.mcp_client import close_http_client, warmup_http_client
+from agents.thought_logging import evict_stale_realtime_thoughts_forever
+from db.core import async_engine
+from services.ximilar import close_ximilar_clients
+from core.settings import settings
+
+logging.basicConfig(level=settings.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+# httpx logs every request at INFO - one line per MCP/OpenAI call
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+logger.info("OPENAI_API_KEY set: %s", bool(settings.openai_api_key))
+
+# Agent debug logging is per step per card; keep it off unless explicitly enabled.
+# Records are handed to a queue and written by a listener thread, so logging never blocks the event loop.
+_agent_log_queue = queue.SimpleQueue()
+_agent_log_handler = logging.StreamHandler()
+_agent_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_agent_log_listener = QueueListener(_agent_log_queue, _agent_log_handler)
+agents_logger = logging.getLogger("agents")
+agents_logger.setLevel(settings.agent_log_level)
+agents_logger.addHandler(QueueHandler(_agent_log_queue))
+agents_logger.propagate = False
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _agent_log_listener.start()
+    # Connect to the MCP server in the background so the first batch doesn't pay for it
+    warmup = asyncio.create_task(warmup_http_client())
+    # Sessions whose stream is never read (or never cleared) would otherwise keep their thoughts forever
+    thought_gc = asyncio.create_task(evict_stale_realtime_thoughts_forever())
+    yield
+    warmup.cancel()
+    thought_gc.cancel()
+    # Close the shared OpenAI client and the pooled MCP connections on shutdown
+    await ai_agent.aclose()
+    await close_openai_client()
+    await close_http_client()
+    await close_ximilar_clients()
+    await async_engine.dispose()
+    _agent_log_listener.stop()
+
+class SSEAwareGZipMiddleware(GZipMiddleware):
+    """GZip responses, except Server-Sent Event streams
+    
+    The gzip stream is never flushed between chunks, so compressed events would sit in the
+    compressor instead of reaching the client. The decision is made on the response's
+    content type, whatever the request's Accept header says: event-stream messages bypass
+    the gzip layer and go straight to the server.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def app(scope, receive, gzip_send):
+            is_event_stream = False
+            
+            async def route(message):
+                nonlocal is_event_stream
+                if message["type"] == "http.response.start":
+                    content_type = Headers(raw=message["headers"]).get("content-type", "")
+                    is_event_stream = content_type.startswith("text/event-stream")
+                await (send if is_event_stream else gzip_send)(message)
+            
+            await self.app(scope, receive, route)
+        
+        await GZipMiddleware(app, self.minimum_size, self.compresslevel)(scope, receive, send)
 
-# Load environment variables from .env file
-env_path = Path(__file__).parent.parent.parent / ".env"
-print(f"🔧 Loading .env from: {env_path}")
-print(f"🔧 .env file exists: {env_path.exists()}")
-load_dotenv(env_path)
-print(f"🔧 OPENAI_API_KEY loaded: {bool(os.getenv('OPENAI_API_KEY'))}")
-print(f"🔧 OPENAI_API_KEY value: {os.getenv('OPENAI_API_KEY', 'NOT_SET')[:20]}...")
-
-app = FastAPI(title="TCG Pipeline API")
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],  # Frontend URLs
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-@app.get("/")
 def root():
     return {
         "message": "TCG Pipeline API",
@@ -41,12 +96,32 @@ def root():
         }
     }
 
-@app.get("/health/live")
 def health_live():
     return {"status": "ok"}
 
-app.include_router(debug_storage.router, prefix="/debug", tags=["debug"])
-app.include_router(db_check.router, tags=["db"])
-app.include_router(ximilar_debug.router, prefix="/ximilar", tags=["ximilar"])
-app.include_router(review_routes.router, tags=["review"])
-app.include_router(ai_batch.router, prefix="/ai", tags=["ai-agent"])
\ No newline at end of file
+def create_app() -> FastAPI:
+    """Build the API app: middleware, routes and routers are registered exactly once here."""
+    app = FastAPI(title="TCG Pipeline API", lifespan=lifespan)
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],  # Frontend URLs
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Batch results carry base64 images and thought logs; compress anything worth it
+    app.add_middleware(SSEAwareGZipMiddleware, minimum_size=512)
+
+    app.add_api_route("/", root, methods=["GET"])
+    app.add_api_route("/health/live", health_live, methods=["GET"])
+
+    app.include_router(debug_storage.router, prefix="/debug", tags=["debug"])
+    app.include_router(db_check.router, tags=["db"])
+    app.include_router(ximilar_debug.router, prefix="/ximilar", tags=["ximilar"])
+    app.include_router(review_routes.router, tags=["review"])
+    app.include_router(ai_batch.router, prefix="/ai", tags=["ai-agent"])
+    return app
+
+app = create_app()
\ No newline at end of file
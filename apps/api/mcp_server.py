@@ -4,28 +4,203 @@ Exposes existing tools as MCP functions for AI Agent to use
 """
 from __future__ import annotations
 import asyncio
-import json
-from typing import Any, Dict, List, Optional
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import httpx
-# Load environment variables BEFORE importing services
-from dotenv import load_dotenv
+import copy
+import hashlib
+import logging
 import os
-load_dotenv("../../.env")
-
-from services.ximilar import identify_card, edit_image, grade_card, enhance_image
+import threading
+import time
+import orjson
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import Base64Bytes, BaseModel
+import httpx
+from services.ximilar import identify_card, edit_image, grade_card, enhance_image, close_ximilar_clients
 from services.description import build_listing_description
+from storage.minio_adapter import get_bytes, put_bytes
 from core.settings import settings
 import base64
-from PIL import Image
+from PIL import Image, features as pil_features
+from PIL import __version__ as pil_version
 import io
 
-# Environment variables loaded successfully
+try:
+    # SIMD-accelerated base64 (several times faster on multi-MB card images)
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+_b64decode = _b64.b64decode
+_b64encode = _b64.b64encode
+
+try:
+    # Reads dimensions straight from the header, without Pillow's plugin probing
+    import imagesize
+except ImportError:
+    imagesize = None
+
+logger = logging.getLogger(__name__)
 
 # MCP Server Configuration
 MCP_SERVER_PORT = 8001
 
+# Tools whose first argument is the card image
+IMAGE_TOOLS = {"check_orientation", "rotate_image", "remove_background", "identify_card", "grade_card", "enhance_image", "process_card_batch"}
+
+# Uploaded images by sha256 hex digest, LRU-bounded. A client that has uploaded an image
+# once can pass image_ref / original_ref instead of the bytes on later calls.
+_image_store: "OrderedDict[str, bytes]" = OrderedDict()
+
+# Error prefix telling the client a ref has been evicted and the image must be re-uploaded
+UNKNOWN_IMAGE_REF = "Unknown image ref"
+
+# Ref of each stored image by object identity, so a tool given stored bytes doesn't hash them again
+_image_refs: Dict[int, str] = {}
+
+def _store_image(data: bytes) -> str:
+    """Keep an uploaded image and return its content-addressed ref"""
+    ref = hashlib.sha256(data).hexdigest()
+    previous = _image_store.get(ref)
+    if previous is not None:
+        _image_refs.pop(id(previous), None)
+    _image_store[ref] = data
+    _image_store.move_to_end(ref)
+    _image_refs[id(data)] = ref
+    while len(_image_store) > settings.mcp_image_store_max_entries:
+        _, evicted = _image_store.popitem(last=False)
+        _image_refs.pop(id(evicted), None)
+    return ref
+
+def _content_digest(data: bytes) -> str:
+    """sha256 hex digest of an image, reusing the ref when the bytes came from the image store"""
+    ref = _image_refs.get(id(data))
+    # The store holds a reference to its bytes, so a live entry's id can't belong to another object
+    if ref is not None and _image_store.get(ref) is data:
+        return ref
+    return hashlib.sha256(data).hexdigest()
+
+# Successful Ximilar/enhancement results by operation + image content, TTL- and LRU-bounded, so
+# re-running the same card (a retry, a refresh, the same image in another batch) skips the network.
+# Calls in flight are stored too, so concurrent requests for the same image share one call.
+_tool_cache: "OrderedDict[str, Tuple[float, asyncio.Future]]" = OrderedDict()
+
+async def _cached_call(op: str, func, image_bytes: bytes):
+    """Return func(image_bytes), shared with any recent or in-flight call for the same op and image"""
+    key = f"{op}:{_content_digest(image_bytes)}"
+    now = time.monotonic()
+    entry = _tool_cache.get(key)
+    if entry is not None and now - entry[0] <= settings.mcp_cache_ttl:
+        _tool_cache.move_to_end(key)
+        future = entry[1]
+    else:
+        future = asyncio.ensure_future(func(image_bytes))
+        _tool_cache[key] = (now, future)
+        _tool_cache.move_to_end(key)
+        while len(_tool_cache) > settings.mcp_cache_max_entries:
+            _tool_cache.popitem(last=False)
+    try:
+        # Shielded: one caller being cancelled mustn't cancel the call for everyone sharing it
+        result = await asyncio.shield(future)
+    except Exception:
+        # Don't cache failures
+        if _tool_cache.get(key, (None, None))[1] is future:
+            del _tool_cache[key]
+        raise
+    # Callers get their own copy of dict results
+    return copy.deepcopy(result)
+
+async def _resolve_image(upload: Optional[UploadFile], ref: Optional[str], key: Optional[str] = None) -> Optional[bytes]:
+    """Image bytes from an upload, a MinIO object key (both stored) or a previously uploaded ref"""
+    if upload is not None:
+        data = await upload.read()
+        if data:
+            _store_image(data)
+        return data
+    if key:
+        # The MinIO client is synchronous
+        data = await asyncio.to_thread(get_bytes, key)
+        if data:
+            _store_image(data)
+        return data
+    if ref:
+        data = _image_store.get(ref)
+        if data is None:
+            raise LookupError(f"{UNKNOWN_IMAGE_REF}: {ref}")
+        _image_store.move_to_end(ref)
+        return data
+    return None
+
+# PIL work on full-size card images is CPU-bound C code that would hold the event loop for
+# tens to hundreds of milliseconds; it runs here instead (Pillow releases the GIL while it works)
+_image_executor = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="mcp-image")
+
+# Encoder settings for images re-encoded mid-pipeline. Later steps decode them again, so JPEG
+# keeps enough quality for identification/grading (Pillow's default is 75 at 4:2:0) and PNG
+# uses the fastest deflate level (the default, 6, costs several times the CPU for a modest size saving).
+_ENCODE_PARAMS: Dict[str, Dict[str, Any]] = {
+    "JPEG": {"quality": 92, "subsampling": 1},
+    "PNG": {"compress_level": 1},
+}
+
+def _rotate(image_bytes: bytes, angle: int, expand: bool, fillcolor: str):
+    """Rotate an encoded image; returns (rotated bytes, original (w, h), new (w, h))
+    
+    Pillow already turns multiples of 90 degrees into a lossless transpose; a whole turn
+    skips the decode and re-encode altogether and returns the input unchanged.
+    """
+    if angle % 360 == 0:
+        size = _image_size(image_bytes)
+        return image_bytes, size, size
+    image = Image.open(io.BytesIO(image_bytes))
+    rotated_image = image.rotate(angle, expand=expand, fillcolor=fillcolor)
+    
+    # Convert back to bytes in the original format (read before rotating), falling back to PNG
+    return _encode(rotated_image, image.format or 'PNG'), image.size, rotated_image.size
+
+# Per-thread encode buffer, reused across images. A fresh BytesIO grows by reallocating and
+# page-faults in every page it touches; a reused one is already big enough and resident.
+# Buffers that grew past _ENCODE_BUFFER_MAX_BYTES are dropped instead of kept.
+_encode_buffers = threading.local()
+_ENCODE_BUFFER_MAX_BYTES = 16 * 1024 * 1024
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    """Encode an image with _ENCODE_PARAMS, into this thread's reusable buffer where possible"""
+    if image_format not in _ENCODE_PARAMS:
+        # Only the JPEG/PNG writers are known to write strictly forwards (so the data ends at tell())
+        img_buffer = io.BytesIO()
+        image.save(img_buffer, format=image_format)
+        return img_buffer.getvalue()
+    
+    # No truncate(): it would shrink the buffer again; bytes past tell() are stale and ignored
+    img_buffer = getattr(_encode_buffers, "buffer", None) or io.BytesIO()
+    img_buffer.seek(0)
+    image.save(img_buffer, format=image_format, **_ENCODE_PARAMS[image_format])
+    size = img_buffer.tell()
+    with img_buffer.getbuffer() as view:
+        data = bytes(view[:size])
+    _encode_buffers.buffer = img_buffer if size <= _ENCODE_BUFFER_MAX_BYTES else None
+    return data
+
+def _image_size(image_bytes: bytes) -> Tuple[int, int]:
+    """(width, height) from the image header; pixels are never decoded"""
+    if imagesize is not None:
+        try:
+            width, height = imagesize.get(io.BytesIO(image_bytes))
+            if width > 0 and height > 0:
+                return width, height
+        except ValueError:
+            pass
+    # Formats imagesize doesn't know (and malformed images, for Pillow's error message)
+    return Image.open(io.BytesIO(image_bytes)).size
+
+# Images batch_process produces, and the suffix each is stored under (after the original's
+# MinIO key) for cards given by key
+BATCH_IMAGE_SUFFIXES = {"background_removed": "bgremoved", "enhanced": "enhanced"}
+
 class MCPRequest(BaseModel):
     method: str
     params: Dict[str, Any]
@@ -34,6 +209,34 @@ class MCPResponse(BaseModel):
     result: Any = None
     error: Optional[str] = None
 
+class ImageToolRequest(BaseModel):
+    # Base64Bytes is decoded during validation, so the tools get bytes without a second pass
+    image_bytes: Base64Bytes
+
+class RotateImageRequest(ImageToolRequest):
+    angle: int = -90
+    expand: bool = True
+    fillcolor: str = "white"
+
+class ProcessCardBatchRequest(ImageToolRequest):
+    original_bytes: Optional[Base64Bytes] = None
+    ops: Optional[List[str]] = None
+
+# Request model of each image tool's JSON endpoint (POST /mcp/json/{method})
+IMAGE_TOOL_REQUESTS = {
+    "check_orientation": ImageToolRequest,
+    "rotate_image": RotateImageRequest,
+    "remove_background": ImageToolRequest,
+    "identify_card": ImageToolRequest,
+    "grade_card": ImageToolRequest,
+    "enhance_image": ImageToolRequest,
+    "process_card_batch": ProcessCardBatchRequest
+}
+
+class BatchProcessRequest(BaseModel):
+    cards: List[Dict[str, Any]]
+    options: Dict[str, bool] = {}
+
 class TCGMCPTools:
     """
     MCP Tools for TCG Pipeline
@@ -49,19 +252,20 @@ class TCGMCPTools:
             "grade_card": self.grade_card,
             "enhance_image": self.enhance_image,
             "generate_description": self.generate_description,
+            "process_card_batch": self.process_card_batch,
             "batch_process": self.batch_process
         }
+        # Image-producing tools with a bytes-in, bytes-out entry point (POST /mcp/raw/{method})
+        self.raw_tools = {
+            "rotate_image": self._rotate_image_raw,
+            "remove_background": self._remove_background_raw,
+            "enhance_image": self._enhance_image_raw
+        }
     
-    async def check_orientation(self, image_bytes: str) -> Dict[str, Any]:
+    async def check_orientation(self, image_bytes: bytes) -> Dict[str, Any]:
         """Check if card is in portrait orientation (detection only)"""
         try:
-            # Decode base64 string back to bytes
-            if isinstance(image_bytes, str):
-                image_bytes = base64.b64decode(image_bytes)
-            
-            # Open image with PIL
-            image = Image.open(io.BytesIO(image_bytes))
-            width, height = image.size
+            width, height = _image_size(image_bytes)
             
             # Check if image is in landscape (width > height)
             is_landscape = width > height
@@ -95,34 +299,19 @@ class TCGMCPTools:
                 "message": "Orientation check failed"
             }
     
-    async def rotate_image(self, image_bytes: str, angle: int = -90, expand: bool = True, fillcolor: str = "white") -> Dict[str, Any]:
+    async def rotate_image(self, image_bytes: bytes, angle: int = -90, expand: bool = True, fillcolor: str = "white") -> Dict[str, Any]:
         """Rotate image by specified angle using Pillow"""
         try:
-            # Decode base64 string back to bytes
-            if isinstance(image_bytes, str):
-                image_bytes = base64.b64decode(image_bytes)
-            
-            # Open image with PIL
-            image = Image.open(io.BytesIO(image_bytes))
-            original_width, original_height = image.size
-            
-            # Rotate the image
-            rotated_image = image.rotate(angle, expand=expand, fillcolor=fillcolor)
-            new_width, new_height = rotated_image.size
-            
-            # Convert back to bytes
-            img_buffer = io.BytesIO()
-            # Preserve original format if possible
-            if image.format:
-                rotated_image.save(img_buffer, format=image.format)
-            else:
-                rotated_image.save(img_buffer, format='PNG')
-            
-            rotated_bytes = img_buffer.getvalue()
+            # Open, rotate and re-encode off the event loop
+            rotated_bytes, (original_width, original_height), (new_width, new_height) = (
+                await asyncio.get_running_loop().run_in_executor(
+                    _image_executor, _rotate, image_bytes, angle, expand, fillcolor
+                )
+            )
             
             return {
                 "success": True,
-                "rotated_image": base64.b64encode(rotated_bytes).decode('utf-8'),
+                "rotated_image": _b64encode(rotated_bytes).decode('utf-8'),
                 "original_dimensions": {"width": original_width, "height": original_height},
                 "new_dimensions": {"width": new_width, "height": new_height},
                 "rotation_angle": angle,
@@ -138,18 +327,20 @@ class TCGMCPTools:
                 "message": "Image rotation failed"
             }
     
-    async def remove_background(self, image_bytes: str) -> Dict[str, Any]:
+    async def _rotate_image_raw(self, image_bytes: bytes, angle: int = -90, expand: bool = True, fillcolor: str = "white") -> bytes:
+        """Rotate the image, bytes in and out (no base64; raises on failure)"""
+        rotated_bytes, _, _ = await asyncio.get_running_loop().run_in_executor(
+            _image_executor, _rotate, image_bytes, angle, expand, fillcolor
+        )
+        return rotated_bytes
+    
+    async def remove_background(self, image_bytes: bytes) -> Dict[str, Any]:
         """Remove background from card image"""
         try:
-            import base64
-            # Decode base64 string back to bytes
-            if isinstance(image_bytes, str):
-                image_bytes = base64.b64decode(image_bytes)
-            
-            cleaned_bytes = await edit_image(image_bytes)
+            cleaned_bytes = await self._remove_background_raw(image_bytes)
             return {
                 "success": True,
-                "processed_image": base64.b64encode(cleaned_bytes).decode('utf-8'),
+                "processed_image": _b64encode(cleaned_bytes).decode('utf-8'),
                 "message": "Background removed successfully"
             }
         except Exception as e:
@@ -159,15 +350,14 @@ class TCGMCPTools:
                 "message": "Background removal failed"
             }
     
-    async def identify_card(self, image_bytes: str) -> Dict[str, Any]:
+    async def _remove_background_raw(self, image_bytes: bytes) -> bytes:
+        """Remove the background, bytes in and out (no base64; raises on failure)"""
+        return await _cached_call("remove_background", edit_image, image_bytes)
+    
+    async def identify_card(self, image_bytes: bytes) -> Dict[str, Any]:
         """Identify the trading card"""
         try:
-            import base64
-            # Decode base64 string back to bytes
-            if isinstance(image_bytes, str):
-                image_bytes = base64.b64decode(image_bytes)
-            
-            result = await identify_card(image_bytes)
+            result = await _cached_call("identify_card", identify_card, image_bytes)
             return {
                 "success": True,
                 "identification": result,
@@ -180,15 +370,10 @@ class TCGMCPTools:
                 "message": "Card identification failed"
             }
     
-    async def grade_card(self, image_bytes: str) -> Dict[str, Any]:
+    async def grade_card(self, image_bytes: bytes) -> Dict[str, Any]:
         """Grade the card condition"""
         try:
-            import base64
-            # Decode base64 string back to bytes
-            if isinstance(image_bytes, str):
-                image_bytes = base64.b64decode(image_bytes)
-            
-            grade_result = await grade_card(image_bytes)
+            grade_result = await _cached_call("grade_card", grade_card, image_bytes)
             return {
                 "success": True,
                 "grade": grade_result,
@@ -201,18 +386,13 @@ class TCGMCPTools:
                 "message": "Card grading failed"
             }
     
-    async def enhance_image(self, image_bytes: str) -> Dict[str, Any]:
+    async def enhance_image(self, image_bytes: bytes) -> Dict[str, Any]:
         """Enhance image quality"""
         try:
-            import base64
-            # Decode base64 string back to bytes
-            if isinstance(image_bytes, str):
-                image_bytes = base64.b64decode(image_bytes)
-            
-            enhanced_bytes = await enhance_image(image_bytes)
+            enhanced_bytes = await self._enhance_image_raw(image_bytes)
             return {
                 "success": True,
-                "enhanced_image": base64.b64encode(enhanced_bytes).decode('utf-8'),
+                "enhanced_image": _b64encode(enhanced_bytes).decode('utf-8'),
                 "message": "Image enhanced successfully"
             }
         except Exception as e:
@@ -222,6 +402,10 @@ class TCGMCPTools:
                 "message": "Image enhancement failed"
             }
     
+    async def _enhance_image_raw(self, image_bytes: bytes) -> bytes:
+        """Enhance the image, bytes in and out (no base64; raises on failure)"""
+        return await _cached_call("enhance_image", enhance_image, image_bytes)
+    
     async def generate_description(self, id_result: Dict, grade_result: Dict, confidence: float, needs_review: bool) -> Dict[str, Any]:
         """Generate eBay listing description"""
         try:
@@ -243,9 +427,49 @@ class TCGMCPTools:
                 "message": "Description generation failed"
             }
     
+    async def process_card_batch(self, image_bytes: bytes, original_bytes: Optional[bytes] = None, ops: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Run identification, grading and enhancement for one card in a single call
+        
+        Identification and enhancement use image_bytes; grading uses original_bytes when
+        given (Ximilar needs the original image). Ops run concurrently and each keeps its
+        own success/error result, keyed by op name.
+        """
+        try:
+            original_bytes = original_bytes or image_bytes
+            
+            runners = {
+                "identify": lambda: self.identify_card(image_bytes),
+                "grade": lambda: self.grade_card(original_bytes),
+                "enhance": lambda: self.enhance_image(image_bytes)
+            }
+            ops = list(ops or runners)
+            unknown = [op for op in ops if op not in runners]
+            if unknown:
+                return {
+                    "success": False,
+                    "error": f"Unknown ops: {', '.join(unknown)}",
+                    "message": "Card batch processing failed"
+                }
+            
+            outcomes = await asyncio.gather(*[runners[op]() for op in ops])
+            return {
+                "success": True,
+                "results": dict(zip(ops, outcomes)),
+                "message": "Card batch processed"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "message": "Card batch processing failed"
+            }
+    
     async def batch_process(self, cards: List[Dict], options: Dict[str, bool]) -> Dict[str, Any]:
         """
         Process multiple cards with specified options
+        cards: [{"image_bytes": base64} or {"image_key": MinIO object key}]; for a card given by
+            key, produced images are written to MinIO as "<key>.bgremoved" / "<key>.enhanced" and
+            returned as background_removed_key / enhanced_key instead of base64
         options: {
             "remove_background": bool,
             "identify": bool,
@@ -254,78 +478,8 @@ class TCGMCPTools:
             "generate_description": bool
         }
         """
-        results = []
-        
-        for i, card in enumerate(cards):
-            card_result = {
-                "card_index": i,
-                "original_image": card.get("image_bytes"),
-                "steps_completed": [],
-                "results": {},
-                "errors": []
-            }
-            
-            try:
-                # Step 1: Remove Background (if requested and available)
-                if options.get("remove_background", True) and card.get("image_bytes"):
-                    bg_result = await self.remove_background(card["image_bytes"])
-                    if bg_result["success"]:
-                        card_result["results"]["background_removed"] = bg_result["processed_image"]
-                        card_result["steps_completed"].append("background_removed")
-                    else:
-                        card_result["errors"].append(f"Background removal: {bg_result['error']}")
-                
-                # Step 2: Identify Card (if requested)
-                if options.get("identify", True):
-                    image_to_use = card_result["results"].get("background_removed") or card.get("image_bytes")
-                    if image_to_use:
-                        id_result = await self.identify_card(image_to_use)
-                        if id_result["success"]:
-                            card_result["results"]["identification"] = id_result["identification"]
-                            card_result["steps_completed"].append("identified")
-                        else:
-                            card_result["errors"].append(f"Identification: {id_result['error']}")
-                
-                # Step 3: Grade Card (if requested and identified)
-                if options.get("grade", True) and "identification" in card_result["results"]:
-                    image_to_use = card_result["results"].get("background_removed") or card.get("image_bytes")
-                    if image_to_use:
-                        grade_result = await self.grade_card(image_to_use)
-                        if grade_result["success"]:
-                            card_result["results"]["grade"] = grade_result["grade"]
-                            card_result["steps_completed"].append("graded")
-                        else:
-                            card_result["errors"].append(f"Grading: {grade_result['error']}")
-                
-                # Step 4: Enhance Image (if requested)
-                if options.get("enhance", False):
-                    image_to_use = card_result["results"].get("background_removed") or card.get("image_bytes")
-                    if image_to_use:
-                        enhance_result = await self.enhance_image(image_to_use)
-                        if enhance_result["success"]:
-                            card_result["results"]["enhanced"] = enhance_result["enhanced_image"]
-                            card_result["steps_completed"].append("enhanced")
-                        else:
-                            card_result["errors"].append(f"Enhancement: {enhance_result['error']}")
-                
-                # Step 5: Generate Description (if requested and identified)
-                if options.get("generate_description", True) and "identification" in card_result["results"]:
-                    id_data = card_result["results"]["identification"]
-                    grade_data = card_result["results"].get("grade", {})
-                    confidence = id_data.get("confidence", 0.0)
-                    needs_review = id_data.get("needsManualReview", True)
-                    
-                    desc_result = await self.generate_description(id_data, grade_data, confidence, needs_review)
-                    if desc_result["success"]:
-                        card_result["results"]["description"] = desc_result["description"]
-                        card_result["steps_completed"].append("description_generated")
-                    else:
-                        card_result["errors"].append(f"Description: {desc_result['error']}")
-                
-            except Exception as e:
-                card_result["errors"].append(f"Processing error: {str(e)}")
-            
-            results.append(card_result)
+        results = [card_result async for card_result in self.batch_process_stream(cards, options)]
+        results.sort(key=lambda card_result: card_result["card_index"])
         
         return {
             "success": True,
@@ -336,12 +490,157 @@ class TCGMCPTools:
                 "failed": len([r for r in results if r["errors"]])
             }
         }
+    
+    async def batch_process_stream(self, cards: List[Dict], options: Dict[str, bool]) -> AsyncIterator[Dict[str, Any]]:
+        """Like batch_process, but yield each card's result as soon as it is done (completion order)"""
+        # Cards are independent and every step waits on Ximilar, so cards overlap (bounded, to respect
+        # the API quota); each card's steps still run in order
+        semaphore = asyncio.Semaphore(settings.mcp_batch_concurrency)
+        
+        async def process(i: int, card: Dict) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._process_batch_card(i, card, options)
+        
+        tasks = [asyncio.create_task(process(i, card)) for i, card in enumerate(cards)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The consumer went away (e.g. a client disconnected mid-stream)
+            for task in tasks:
+                task.cancel()
+    
+    async def _process_batch_card(self, i: int, card: Dict, options: Dict[str, bool]) -> Dict[str, Any]:
+        """Run one card of a batch_process call through the requested steps"""
+        image_key = card.get("image_key")
+        card_result = {
+            "card_index": i,
+            "original_image": card.get("image_bytes"),
+            "steps_completed": [],
+            "results": {},
+            "errors": []
+        }
+        if image_key:
+            card_result["original_key"] = image_key
+        
+        try:
+            # Decode each image once; every later step reuses the same bytes
+            original_bytes = card.get("image_bytes")
+            if isinstance(original_bytes, str):
+                original_bytes = _b64decode(original_bytes)
+            elif original_bytes is None and image_key:
+                original_bytes = await asyncio.to_thread(get_bytes, image_key)
+            image_to_use = original_bytes
+            
+            # Step 1: Remove Background (if requested and available)
+            # Images stay bytes between steps; they are base64-encoded once, for the response
+            if options.get("remove_background", True) and original_bytes:
+                try:
+                    image_to_use = await self._remove_background_raw(original_bytes)
+                    card_result["results"]["background_removed"] = image_to_use
+                    card_result["steps_completed"].append("background_removed")
+                except Exception as e:
+                    card_result["errors"].append(f"Background removal: {str(e)}")
+            
+            # Steps 2-4: identification, grading and enhancement all take the same image and
+            # don't depend on each other, so they run concurrently
+            steps = {}
+            if image_to_use:
+                if options.get("identify", True):
+                    steps["identify"] = self.identify_card(image_to_use)
+                if options.get("grade", True):
+                    steps["grade"] = self.grade_card(image_to_use)
+                if options.get("enhance", False):
+                    steps["enhance"] = self._enhance_image_raw(image_to_use)
+            outcomes = dict(zip(steps, await asyncio.gather(*steps.values(), return_exceptions=True)))
+            
+            id_result = outcomes.get("identify")
+            if id_result is not None:
+                if isinstance(id_result, Exception):
+                    card_result["errors"].append(f"Identification: {str(id_result)}")
+                elif id_result["success"]:
+                    card_result["results"]["identification"] = id_result["identification"]
+                    card_result["steps_completed"].append("identified")
+                else:
+                    card_result["errors"].append(f"Identification: {id_result['error']}")
+            
+            grade_result = outcomes.get("grade")
+            if grade_result is not None:
+                if isinstance(grade_result, Exception):
+                    card_result["errors"].append(f"Grading: {str(grade_result)}")
+                elif grade_result["success"]:
+                    card_result["results"]["grade"] = grade_result["grade"]
+                    card_result["steps_completed"].append("graded")
+                else:
+                    card_result["errors"].append(f"Grading: {grade_result['error']}")
+            
+            enhanced = outcomes.get("enhance")
+            if enhanced is not None:
+                if isinstance(enhanced, Exception):
+                    card_result["errors"].append(f"Enhancement: {str(enhanced)}")
+                else:
+                    card_result["results"]["enhanced"] = enhanced
+                    card_result["steps_completed"].append("enhanced")
+            
+            # Step 5: Generate Description (if requested and identified)
+            if options.get("generate_description", True) and "identification" in card_result["results"]:
+                id_data = card_result["results"]["identification"]
+                grade_data = card_result["results"].get("grade", {})
+                confidence = id_data.get("confidence", 0.0)
+                needs_review = id_data.get("needsManualReview", True)
+                
+                desc_result = await self.generate_description(id_data, grade_data, confidence, needs_review)
+                if desc_result["success"]:
+                    card_result["results"]["description"] = desc_result["description"]
+                    card_result["steps_completed"].append("description_generated")
+                else:
+                    card_result["errors"].append(f"Description: {desc_result['error']}")
+            
+        except Exception as e:
+            card_result["errors"].append(f"Processing error: {str(e)}")
+        
+        await self._finish_batch_images(card_result, image_key)
+        return card_result
+    
+    async def _finish_batch_images(self, card_result: Dict[str, Any], image_key: Optional[str]):
+        """Put a card's produced images in its result: base64, or for a card given by MinIO key,
+        written next to the original with only the new key returned"""
+        results = card_result["results"]
+        produced = {name: results[name] for name in BATCH_IMAGE_SUFFIXES if isinstance(results.get(name), bytes)}
+        if not image_key:
+            for name, data in produced.items():
+                results[name] = _b64encode(data).decode('utf-8')
+            return
+        
+        async def store(name: str, data: bytes):
+            key = f"{image_key}.{BATCH_IMAGE_SUFFIXES[name]}"
+            try:
+                await asyncio.to_thread(put_bytes, key, data)
+                results[f"{name}_key"] = key
+            except Exception as e:
+                card_result["errors"].append(f"Storing {name} image: {str(e)}")
+        
+        for name in produced:
+            del results[name]
+        await asyncio.gather(*(store(name, data) for name, data in produced.items()))
 
 # Initialize MCP Tools
 mcp_tools = TCGMCPTools()
 
-# FastAPI app for MCP Server
-mcp_app = FastAPI(title="TCG MCP Server", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # pillow-simd (versions end in .postN) has SIMD rotate/resize kernels; see AI_AGENT_README.md
+    logger.info(
+        "Pillow %s (SIMD build: %s, libjpeg-turbo: %s)",
+        pil_version, ".post" in pil_version, pil_features.check_feature("libjpeg_turbo")
+    )
+    yield
+    # Every tool shares the pooled Ximilar connections; close them on shutdown
+    await close_ximilar_clients()
+
+# FastAPI app for MCP Server. Responses carry multi-MB base64 images, which orjson encodes
+# several times faster than the stdlib json encoder
+mcp_app = FastAPI(title="TCG MCP Server", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 @mcp_app.post("/mcp/call")
 async def mcp_call(request: MCPRequest) -> MCPResponse:
@@ -364,17 +663,132 @@ async def mcp_call(request: MCPRequest) -> MCPResponse:
                 params.get("needs_review", True)
             )
         else:
-            # For image processing methods
+            # For image processing methods; the tools take raw bytes
             image_bytes = params.get("image_bytes")
             if not image_bytes:
                 return MCPResponse(error="image_bytes parameter required")
-            result = await mcp_tools.tools[method](image_bytes)
+            image_bytes = _b64decode(image_bytes)
+            if method == "process_card_batch":
+                original_bytes = params.get("original_bytes")
+                original_bytes = _b64decode(original_bytes) if original_bytes else None
+                result = await mcp_tools.tools[method](image_bytes, original_bytes, params.get("ops"))
+            else:
+                result = await mcp_tools.tools[method](image_bytes)
         
         return MCPResponse(result=result)
     
     except Exception as e:
         return MCPResponse(error=str(e))
 
+@mcp_app.post("/mcp/call/{method}")
+async def mcp_call_binary(
+    method: str, 
+    image: Optional[UploadFile] = File(None), 
+    original: Optional[UploadFile] = File(None), 
+    image_ref: Optional[str] = Form(None),
+    original_ref: Optional[str] = Form(None),
+    image_key: Optional[str] = Form(None),
+    original_key: Optional[str] = Form(None),
+    params: str = Form("{}")
+) -> MCPResponse:
+    """Handle MCP image tool calls with the image(s) uploaded as raw multipart bytes (no base64)
+    
+    Each image can instead be passed as the ref (sha256 hex) of an earlier upload, or as the
+    key of an object in the MinIO bucket (e.g. a CardPair's front_key).
+    """
+    try:
+        if method not in IMAGE_TOOLS:
+            return MCPResponse(error=f"Unknown image method: {method}")
+        
+        image_bytes = await _resolve_image(image, image_ref, image_key)
+        if not image_bytes:
+            return MCPResponse(error="image file required")
+        
+        kwargs = orjson.loads(params)
+        original_bytes = await _resolve_image(original, original_ref, original_key)
+        if original_bytes is not None:
+            kwargs["original_bytes"] = original_bytes
+        
+        result = await mcp_tools.tools[method](image_bytes, **kwargs)
+        return MCPResponse(result=result)
+    
+    except Exception as e:
+        return MCPResponse(error=str(e))
+
+def _image_tool_endpoint(method: str, request_model: type[ImageToolRequest]):
+    """Build the JSON endpoint of one image tool; its request model decodes the base64 images"""
+    async def endpoint(request) -> MCPResponse:
+        try:
+            # dict(), not model_dump(): the latter re-encodes Base64Bytes fields
+            result = await mcp_tools.tools[method](**dict(request))
+            return MCPResponse(result=result)
+        except Exception as e:
+            return MCPResponse(error=str(e))
+    
+    # Annotations are strings under `from __future__ import annotations`; FastAPI needs the class
+    endpoint.__annotations__ = {"request": request_model, "return": MCPResponse}
+    return endpoint
+
+# One route per image tool instead of the generic /mcp/call dispatcher, so each body is
+# validated against that tool's own model
+for _method, _request_model in IMAGE_TOOL_REQUESTS.items():
+    mcp_app.add_api_route(
+        f"/mcp/json/{_method}", _image_tool_endpoint(_method, _request_model),
+        methods=["POST"], name=f"mcp_json_{_method}"
+    )
+
+@mcp_app.post("/mcp/raw/{method}")
+async def mcp_call_raw(
+    method: str,
+    request: Request,
+    image_ref: Optional[str] = None,
+    angle: int = -90,
+    expand: bool = True,
+    fillcolor: str = "white"
+) -> Response:
+    """Run an image-producing tool on a raw application/octet-stream body; the response body is the output image
+    
+    No base64 in either direction. An empty body with ?image_ref= reuses an earlier upload.
+    angle/expand/fillcolor are only used by rotate_image. Failures are HTTP errors: 404 for
+    an unknown method or image ref, 502 when the tool itself fails.
+    """
+    if method not in mcp_tools.raw_tools:
+        raise HTTPException(status_code=404, detail=f"Unknown raw image method: {method}")
+    
+    image_bytes = await request.body()
+    if image_bytes:
+        _store_image(image_bytes)
+    else:
+        try:
+            image_bytes = await _resolve_image(None, image_ref)
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        if not image_bytes:
+            raise HTTPException(status_code=400, detail="image body required")
+    
+    kwargs = {"angle": angle, "expand": expand, "fillcolor": fillcolor} if method == "rotate_image" else {}
+    try:
+        output = await mcp_tools.raw_tools[method](image_bytes, **kwargs)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return Response(content=output, media_type="application/octet-stream")
+
+@mcp_app.post("/mcp/stream/batch_process")
+async def mcp_stream_batch_process(request: BatchProcessRequest) -> StreamingResponse:
+    """batch_process as NDJSON: one line per card result as soon as that card is done, then a summary line
+    
+    Finished cards (with their base64 images) are sent and dropped instead of held until the whole batch is done.
+    """
+    async def lines():
+        failed = 0
+        async for card_result in mcp_tools.batch_process_stream(request.cards, request.options):
+            failed += bool(card_result["errors"])
+            yield orjson.dumps(card_result) + b"\n"
+        total = len(request.cards)
+        yield orjson.dumps({"summary": {"total_cards": total, "successful": total - failed, "failed": failed}}) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @mcp_app.get("/mcp/tools")
 async def list_tools():
     """List available MCP tools"""
@@ -388,6 +802,7 @@ async def list_tools():
             "grade_card": "Grade the card condition",
             "enhance_image": "Enhance image quality",
             "generate_description": "Generate eBay listing description",
+            "process_card_batch": "Identify, grade and enhance one card in a single call",
             "batch_process": "Process multiple cards with specified options"
         }
     }
@@ -1,10 +1,20 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, JSON, TIMESTAMP, text
+from sqlalchemy import Index, String, JSON, TIMESTAMP, text
 from datetime import datetime
 from .base import Base
 
 class CardPair(Base):
     __tablename__ = "card_pairs"
+    __table_args__ = (
+        # Pairs by status, newest first (dashboard lists)
+        Index("ix_card_pairs_status_created_at", "status", "created_at"),
+        # The manual-review queue; only covers rows that need review, so it stays small
+        Index(
+            "ix_card_pairs_needs_manual_created_at",
+            "created_at",
+            postgresql_where=text("status = 'needs_manual'")
+        ),
+    )
 
     # UUID string or any unique id you prefer (we’ll store UUID as str)
     id: Mapped[str] = mapped_column(String, primary_key=True)
@@ -10,7 +10,9 @@ from fastapi import APIRouter, UploadFile, HTTPException, Form, BackgroundTasks
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import base64
-from agents import ai_agent, get_realtime_thoughts, clear_realtime_thoughts
+from agents import (
+    ai_agent, get_realtime_thoughts, get_realtime_thoughts_json_since, clear_realtime_thoughts, wait_for_realtime_thoughts,
+)
 
 router = APIRouter()
 
@@ -267,7 +269,10 @@ async def process_batch_async(
                 # Create a new AI Agent instance for this session
                 from agents import AIAgent
                 agent = AIAgent()
-                results = await agent.process_batch_pairs(card_pairs, options_dict, session_id)
+                try:
+                    results = await agent.process_batch_pairs(card_pairs, options_dict, session_id)
+                finally:
+                    await agent.aclose()
                 # Store results for later retrieval
                 background_tasks[session_id] = {
                     "status": "completed",
@@ -375,16 +380,17 @@ async def stream_agent_thoughts(session_id: str):
         last_count = 0
         timeout_count = 0
         max_timeout = 120  # 120 seconds timeout (increased for longer processing)
-        check_interval = 0.5  # Check every 500ms
+        check_interval = 0.5  # Check task status at least every 500ms; new thoughts wake the stream at once
         
         while timeout_count < max_timeout:
-            thoughts = get_realtime_thoughts(session_id)
-            if len(thoughts) > last_count:
-                # Send new thoughts
-                for thought in thoughts[last_count:]:
-                    yield f"data: {json.dumps(thought)}\n\n"
-                last_count = len(thoughts)
+            new_thoughts, total = get_realtime_thoughts_json_since(session_id, last_count)
+            if new_thoughts:
+                # Send new thoughts (already serialized once when they were stored)
+                for thought in new_thoughts:
+                    yield b"data: " + thought + b"\n\n"
                 timeout_count = 0  # Reset timeout when we get new thoughts
+            had_new_thoughts = total > last_count
+            last_count = total
             
             # Check if processing is complete
             if session_id in background_tasks:
@@ -398,15 +404,15 @@ async def stream_agent_thoughts(session_id: str):
                     break
             
             # If no new thoughts and no background task yet, wait a bit before timing out
-            if len(thoughts) == last_count and session_id not in background_tasks:
+            if not had_new_thoughts and session_id not in background_tasks:
                 # Still waiting for processing to start, don't timeout yet
                 timeout_count = 0
             
             # Only increment timeout if we've had thoughts but no new ones for a while
-            if len(thoughts) == last_count and session_id in background_tasks:
+            if not had_new_thoughts and session_id in background_tasks:
                 timeout_count += 1
             
-            await asyncio.sleep(check_interval)
+            await wait_for_realtime_thoughts(session_id, last_count, check_interval)
         
         # Timeout reached
         yield f"data: {json.dumps({'type': 'timeout', 'message': 'Processing timeout'})}\n\n"
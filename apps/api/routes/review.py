@@ -2,7 +2,7 @@ from fastapi import APIRouter, UploadFile, Form, HTTPException
 from sqlalchemy import select
 from services.ximilar import identify_card
 from services.review import needs_manual_review
-from db.core import SessionLocal
+from db.core import AsyncSessionLocal
 from models.card_pair import CardPair
 
 router = APIRouter()
@@ -24,8 +24,8 @@ async def review_pair(
         conf = float(id_norm.get("confidence") or 0.0)
         manual = needs_manual_review(conf)
 
-        with SessionLocal() as db:
-            obj = db.execute(select(CardPair).where(CardPair.id == pair_id)).scalar_one_or_none()
+        async with AsyncSessionLocal() as db:
+            obj = (await db.execute(select(CardPair).where(CardPair.id == pair_id))).scalar_one_or_none()
             if obj is None:
                 # Minimal upsert so you can test; in Sprint 5 you'll have full upload path.
                 obj = CardPair(
@@ -39,7 +39,7 @@ async def review_pair(
             else:
                 obj.id_json = id_norm
                 obj.status = "needs_manual" if manual else "uploaded"
-            db.commit()
+            await db.commit()
 
         return {
             "pairId": pair_id,
@@ -1,8 +1,11 @@
+import logging
 from fastapi import APIRouter, UploadFile, HTTPException, Query
 from services.ximilar import identify_card, edit_image, grade_card, enhance_image
 from db.repo.card_pairs import set_status_and_id
 from services.description import build_listing_description
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.post("/id")
@@ -19,7 +22,7 @@ async def id_test(
         # Optional DB write if pair_id supplied
         if pair_id:
             status = "needs_manual" if flag else "processed"
-            updated = set_status_and_id(pair_id, status, id_norm)
+            updated = await set_status_and_id(pair_id, status, id_norm)
             # (updated==False means no row found; we still return the response)
             return {
                 **id_norm,
@@ -82,31 +85,31 @@ async def enhance_test(file: UploadFile):
 @router.post("/describe")
 async def describe(file: UploadFile):
     try:
-        print(f"Processing file: {file.filename}, content_type: {file.content_type}")
+        logger.debug("Processing file: %s, content_type: %s", file.filename, file.content_type)
         blob = await file.read()
-        print(f"File size: {len(blob)} bytes")
+        logger.debug("File size: %d bytes", len(blob))
 
         # 1) Identify
-        print("Starting identification...")
+        logger.debug("Starting identification...")
         id_norm = await identify_card(blob)
         confidence = float(id_norm.get("confidence") or 0.0)
         flag = id_norm.get("needsManualReview", True)  # Use flag from id_norm response
-        print(f"Identification complete. Confidence: {confidence}, Manual review: {flag}")
+        logger.debug("Identification complete. Confidence: %s, Manual review: %s", confidence, flag)
 
         # 2) Grade (optional, but your sprint wants it)
-        print("Starting grading...")
+        logger.debug("Starting grading...")
         grade_json = await grade_card(blob)
-        print("Grading complete")
+        logger.debug("Grading complete")
 
         # 3) LLM listing
-        print("Generating listing...")
+        logger.debug("Generating listing...")
         listing = build_listing_description(
             id_norm=id_norm,
             grade_json=grade_json,
             confidence=confidence,
             needsManualReview=flag
         )
-        print("Listing generation complete")
+        logger.debug("Listing generation complete")
         
         return {
             "listing": listing,
@@ -118,9 +121,7 @@ async def describe(file: UploadFile):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in describe endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in describe endpoint: %s", e)
         
         # Handle specific timeout errors
         if "ReadTimeout" in str(e) or "timeout" in str(e).lower():
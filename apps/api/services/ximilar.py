@@ -1,9 +1,22 @@
 from __future__ import annotations
+import base64
+import logging
 import httpx
 from typing import Any, Dict, List, Optional, Tuple
 from fastapi import HTTPException
 from core.settings import settings
 
+logger = logging.getLogger(__name__)
+
+try:
+    # SIMD-accelerated base64 (several times faster on multi-MB card images)
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+_b64decode = _b64.b64decode
+_b64encode = _b64.b64encode
+
 # ---- Config ----
 # Ximilar Collectibles Recognition API endpoints
 TCG_ID_PATH = "/collectibles/v2/tcg_id"           # TCG card identification
@@ -13,6 +26,37 @@ GRADING_PATH = "/card-grader/v2/grade"            # Card grading
 DEFAULT_TIMEOUT = httpx.Timeout(connect=30.0, read=120.0, write=60.0, pool=30.0)
 HEADERS = {"Authorization": f"Token {settings.ximilar_api_key}"}
 
+# One pooled client per process for Ximilar calls, and one without the Ximilar headers for
+# downloading result images, so batches reuse kept-alive connections instead of a TCP+TLS
+# handshake per call
+_ximilar_client: Optional[httpx.AsyncClient] = None
+_download_client: Optional[httpx.AsyncClient] = None
+_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+def get_ximilar_client() -> httpx.AsyncClient:
+    """Get the shared Ximilar API client, creating it on first use"""
+    global _ximilar_client
+    if _ximilar_client is None or _ximilar_client.is_closed:
+        _ximilar_client = httpx.AsyncClient(
+            base_url=settings.ximilar_base, headers=HEADERS, timeout=DEFAULT_TIMEOUT, limits=_LIMITS, http2=True
+        )
+    return _ximilar_client
+
+def get_download_client() -> httpx.AsyncClient:
+    """Get the shared client for downloading Ximilar output images, creating it on first use"""
+    global _download_client
+    if _download_client is None or _download_client.is_closed:
+        _download_client = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, limits=_LIMITS, http2=True)
+    return _download_client
+
+async def close_ximilar_clients():
+    """Close the shared Ximilar clients (on shutdown)"""
+    global _ximilar_client, _download_client
+    for client in (_ximilar_client, _download_client):
+        if client is not None:
+            await client.aclose()
+    _ximilar_client = _download_client = None
+
 # ---- Helpers ----
 def _raise_for_status(resp: httpx.Response, ctx: str):
     try:
@@ -160,27 +204,25 @@ async def identify_card(image_bytes: bytes) -> Dict[str, Any]:
             "needsManualReview": not meets_threshold
         }
     
-    async with httpx.AsyncClient(base_url=settings.ximilar_base, headers=HEADERS, timeout=DEFAULT_TIMEOUT) as cx:
-        # Convert image bytes to base64
-        import base64
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+    # Convert image bytes to base64
+    image_base64 = _b64encode(image_bytes).decode('utf-8')
 
-        # Use the correct Ximilar Collectibles Recognition API format
-        payload = {
-            "records": [
-                {
-                    "_base64": image_base64
-                }
-            ]
-        }
+    # Use the correct Ximilar Collectibles Recognition API format
+    payload = {
+        "records": [
+            {
+                "_base64": image_base64
+            }
+        ]
+    }
 
-        resp = await cx.post(
-            TCG_ID_PATH,
-            json=payload
-        )
-        _raise_for_status(resp, "identification")
-        raw = resp.json()
-        return normalize_identification(raw)
+    resp = await get_ximilar_client().post(
+        TCG_ID_PATH,
+        json=payload
+    )
+    _raise_for_status(resp, "identification")
+    raw = resp.json()
+    return normalize_identification(raw)
 
 async def edit_image(image_bytes: bytes) -> bytes:
     """
@@ -193,96 +235,91 @@ async def edit_image(image_bytes: bytes) -> bytes:
     # Mock response for testing when using placeholder key
     if settings.ximilar_api_key == "replace_me":
         # Return a small mock image (1x1 pixel PNG)
-        import base64
-        mock_png = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==")
+        mock_png = _b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg==")
         return mock_png
     
-    async with httpx.AsyncClient(base_url=settings.ximilar_base, headers=HEADERS, timeout=DEFAULT_TIMEOUT) as cx:
-        import base64
-        from PIL import Image
-        import io
+    from PIL import Image
+    import io
+    
+    # Compress image if it's too large (Ximilar has size limits)
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        original_size = len(image_bytes)
         
-        # Compress image if it's too large (Ximilar has size limits)
-        try:
-            image = Image.open(io.BytesIO(image_bytes))
-            original_size = len(image_bytes)
+        # If image is larger than 5MB, compress it
+        if original_size > 5 * 1024 * 1024:  # 5MB
+            logger.debug("Image too large (%d bytes), compressing...", original_size)
             
-            # If image is larger than 5MB, compress it
-            if original_size > 5 * 1024 * 1024:  # 5MB
-                print(f"Image too large ({original_size} bytes), compressing...")
-                
-                # Resize if dimensions are very large
-                max_dimension = 2048
-                if image.width > max_dimension or image.height > max_dimension:
-                    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
-                    print(f"Resized to {image.width}x{image.height}")
-                
-                # Compress as JPEG with quality 85
-                jpeg_buffer = io.BytesIO()
-                if image.mode in ('RGBA', 'LA', 'P'):
-                    # Convert to RGB for JPEG
-                    rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-                    if image.mode == 'P':
-                        image = image.convert('RGBA')
-                    rgb_image.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-                    rgb_image.save(jpeg_buffer, format='JPEG', quality=85, optimize=True)
-                else:
-                    image.convert('RGB').save(jpeg_buffer, format='JPEG', quality=85, optimize=True)
-                
-                image_bytes = jpeg_buffer.getvalue()
-                print(f"Compressed from {original_size} to {len(image_bytes)} bytes")
-        except Exception as e:
-            print(f"Could not compress image: {e}")
-            # Continue with original bytes
-        
-        # Convert to base64 - simple and clean
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-        
-        # Exact format from Ximilar documentation
-        payload = {
-            "records": [
-                {
-                    "_base64": image_base64
-                }
-            ],
-            "white_background": True
-        }
-        
-        print(f"Sending request to Ximilar with base64 length: {len(image_base64)}")
-        
-        resp = await cx.post(
-            "/removebg/precise/removebg",
-            json=payload
-        )
-        
-        print(f"Ximilar response status: {resp.status_code}")
-        print(f"Ximilar response: {resp.text}")
-        
-        if resp.status_code != 200:
-            raise HTTPException(500, f"Ximilar API error: {resp.text}")
+            # Resize if dimensions are very large
+            max_dimension = 2048
+            if image.width > max_dimension or image.height > max_dimension:
+                image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+                logger.debug("Resized to %dx%d", image.width, image.height)
+            
+            # Compress as JPEG with quality 85
+            jpeg_buffer = io.BytesIO()
+            if image.mode in ('RGBA', 'LA', 'P'):
+                # Convert to RGB for JPEG
+                rgb_image = Image.new('RGB', image.size, (255, 255, 255))
+                if image.mode == 'P':
+                    image = image.convert('RGBA')
+                rgb_image.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
+                rgb_image.save(jpeg_buffer, format='JPEG', quality=85, optimize=True)
+            else:
+                image.convert('RGB').save(jpeg_buffer, format='JPEG', quality=85, optimize=True)
+            
+            image_bytes = jpeg_buffer.getvalue()
+            logger.debug("Compressed from %d to %d bytes", original_size, len(image_bytes))
+    except Exception as e:
+        logger.warning("Could not compress image: %s", e)
+        # Continue with original bytes
+    
+    # Convert to base64 - simple and clean
+    image_base64 = _b64encode(image_bytes).decode('utf-8')
+    
+    # Exact format from Ximilar documentation
+    payload = {
+        "records": [
+            {
+                "_base64": image_base64
+            }
+        ],
+        "white_background": True
+    }
+    
+    logger.debug("Sending request to Ximilar with base64 length: %d", len(image_base64))
+    
+    resp = await get_ximilar_client().post(
+        "/removebg/precise/removebg",
+        json=payload
+    )
+    
+    logger.debug("Ximilar response status: %s", resp.status_code)
+    
+    if resp.status_code != 200:
+        raise HTTPException(500, f"Ximilar API error: {resp.text}")
+    
+    result = resp.json()
+    
+    # Get the processed image URL (try white background first, then transparent)
+    if result.get("records") and len(result["records"]) > 0:
+        record = result["records"][0]
         
-        result = resp.json()
+        # Try white background first, then fall back to transparent
+        image_url = record.get("_output_url_whitebg") or record.get("_output_url")
         
-        # Get the processed image URL (try white background first, then transparent)
-        if result.get("records") and len(result["records"]) > 0:
-            record = result["records"][0]
-            
-            # Try white background first, then fall back to transparent
-            image_url = record.get("_output_url_whitebg") or record.get("_output_url")
+        if image_url:
+            # Download the processed image using the shared client without Ximilar headers
+            download_resp = await get_download_client().get(image_url)
             
-            if image_url:
-                # Download the processed image using a separate client without Ximilar headers
-                async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT) as download_client:
-                    download_resp = await download_client.get(image_url)
-                    
-                    if download_resp.status_code == 200:
-                        return download_resp.content
-                    else:
-                        raise HTTPException(500, f"Failed to download processed image: {download_resp.status_code}")
+            if download_resp.status_code == 200:
+                return download_resp.content
             else:
-                raise HTTPException(500, "No image URL in response")
+                raise HTTPException(500, f"Failed to download processed image: {download_resp.status_code}")
         else:
-            raise HTTPException(500, "No records in response")
+            raise HTTPException(500, "No image URL in response")
+    else:
+        raise HTTPException(500, "No records in response")
 
 async def enhance_image(image_bytes: bytes) -> bytes:
     """
@@ -293,11 +330,11 @@ async def enhance_image(image_bytes: bytes) -> bytes:
     import io
     
     try:
-        print(f"Processing simple, effective image enhancement...")
+        logger.debug("Processing simple, effective image enhancement...")
         
         # Open the original image
         image = Image.open(io.BytesIO(image_bytes))
-        print(f"Original image: {image.width}x{image.height}, mode: {image.mode}")
+        logger.debug("Original image: %dx%d, mode: %s", image.width, image.height, image.mode)
         
         # Convert to RGB if needed
         if image.mode != 'RGB':
@@ -325,12 +362,12 @@ async def enhance_image(image_bytes: bytes) -> bytes:
         image.save(output_buffer, format='JPEG', quality=95, optimize=True)
         
         result_bytes = output_buffer.getvalue()
-        print(f"Enhanced image size: {len(result_bytes)} bytes (original: {len(image_bytes)} bytes)")
+        logger.debug("Enhanced image size: %d bytes (original: %d bytes)", len(result_bytes), len(image_bytes))
         
         return result_bytes
         
     except Exception as e:
-        print(f"Enhancement error: {e}")
+        logger.warning("Enhancement error: %s", e)
         raise HTTPException(500, f"Image enhancement failed: {e}")
 
 async def grade_card(image_bytes: bytes) -> Dict[str, Any]:
@@ -352,23 +389,21 @@ async def grade_card(image_bytes: bytes) -> Dict[str, Any]:
             "confidence": 0.92
         }
     
-    async with httpx.AsyncClient(base_url=settings.ximilar_base, headers=HEADERS, timeout=DEFAULT_TIMEOUT) as cx:
-        # Convert image bytes to base64
-        import base64
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-        
-        # Use the correct JSON format for card grading
-        payload = {
-            "records": [
-                {
-                    "_base64": image_base64
-                }
-            ]
-        }
-        
-        resp = await cx.post(
-            GRADING_PATH,
-            json=payload
-        )
-        _raise_for_status(resp, "grading")
-        return resp.json()
\ No newline at end of file
+    # Convert image bytes to base64
+    image_base64 = _b64encode(image_bytes).decode('utf-8')
+    
+    # Use the correct JSON format for card grading
+    payload = {
+        "records": [
+            {
+                "_base64": image_base64
+            }
+        ]
+    }
+    
+    resp = await get_ximilar_client().post(
+        GRADING_PATH,
+        json=payload
+    )
+    _raise_for_status(resp, "grading")
+    return resp.json()
\ No newline at end of file
@@ -3,17 +3,14 @@
 Start MCP Server for TCG Pipeline
 Run this alongside the main API server
 """
+import logging
 import uvicorn
+from core.settings import settings
 from mcp_server import mcp_app, MCP_SERVER_PORT
-from dotenv import load_dotenv
-import os
-
-# Load environment variables from .env file
-load_dotenv("../../.env")
-
-# Environment variables loaded
 
 if __name__ == "__main__":
+    # Application loggers (uvicorn only configures its own)
+    logging.basicConfig(level=settings.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     print(f"🚀 Starting MCP Server on port {MCP_SERVER_PORT}")
     print(f"📡 MCP Server will be available at: http://localhost:{MCP_SERVER_PORT}")
     print(f"🔧 Available tools: http://localhost:{MCP_SERVER_PORT}/mcp/tools")